@@ -7,8 +7,21 @@ Created on Thu Mar  3 21:42:33 2016
 from __future__ import (division as _, print_function as _,
                 absolute_import as _, unicode_literals as _)
 
-from .colorize import colorize
-from . import colorvision
-from . import toolbox
-from . import plot
-from . import ispectrum
+import importlib
+
+# Light: colorize only imports matplotlib when first called
+from .colorize import colorize, colorize_lut
+
+# Subpackages are imported on first attribute access (PEP 562), so e.g.
+# jakely.toolbox does not pull in matplotlib or scipy
+_SUBPACKAGES = ("colorvision", "toolbox", "plot", "ispectrum")
+
+def __getattr__(name):
+    if name in _SUBPACKAGES:
+        module = importlib.import_module("." + name, __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError("module %r has no attribute %r" %(__name__, name))
+
+def __dir__():
+    return sorted(list(globals()) + list(_SUBPACKAGES))
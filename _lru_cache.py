@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Small least-recently-used cache shared by the colormap, resampling and
+stellar flux caches. Kept at the top level and free of heavy imports, since
+`colorize` is imported with the package.
+
+@author: jlustigy
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+__all__ = ["LRUCache", "array_digest"]
+
+class LRUCache(object):
+    """
+    Least-recently-used cache of at most ``maxsize`` entries.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of entries kept
+
+    Example
+    -------
+    >>> cache = LRUCache(32)
+    >>> value = cache.get(key, lambda: expensive(key))
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key, make):
+        """
+        Value of ``key``, calling ``make()`` to build it on a miss.
+
+        Parameters
+        ----------
+        key : hashable
+            Cache key
+        make : callable
+            Function of no arguments returning the value
+
+        Returns
+        -------
+        value : object
+        """
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            value = make()
+            if len(self._data) >= self.maxsize:
+                self._data.popitem(last=False)
+        self._data[key] = value
+        return value
+
+    def clear(self):
+        """Remove all entries"""
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+def array_digest(x):
+    """
+    Hashable digest of the contents of an array, for use as a cache key.
+
+    Parameters
+    ----------
+    x : array
+        Array (converted to float)
+
+    Returns
+    -------
+    key : tuple
+        ``(shape, sha1 hex digest)``
+    """
+    import hashlib
+    x = np.ascontiguousarray(x, dtype=float)
+    return (x.shape, hashlib.sha1(x.tobytes()).hexdigest())
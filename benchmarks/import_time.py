@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Import-time benchmark for jakely.
+
+Times ``import jakely`` (and a few light entry points) in fresh
+interpreters, checks that heavy dependencies are not imported along the
+way, and exits with status 1 if the median time exceeds the budget.
+
+Usage:
+    python benchmarks/import_time.py [--budget SECONDS] [--repeat N]
+
+The package is imported from the parent of this repository (cloned as
+``jakely``), or from PYTHONPATH.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# Seconds, on top of the time to import numpy
+DEFAULT_BUDGET = 0.25
+
+# Modules that must not be imported by the light entry points
+HEAVY = ("matplotlib", "scipy", "colorpy")
+
+STATEMENTS = [
+    "import jakely",
+    "from jakely.toolbox import find_nearest",
+    "from jakely.toolbox import deluxetable",
+]
+
+_PROBE = """
+import sys, time, json
+t0 = time.time()
+import numpy
+t1 = time.time()
+exec(%r)
+t2 = time.time()
+print(json.dumps({"numpy": t1 - t0, "import": t2 - t1,
+                  "heavy": sorted(m for m in %r if m in sys.modules)}))
+"""
+
+def time_import(statement, repeat=5):
+    """Median import time of statement (excluding numpy) and any heavy
+    modules it loaded"""
+    times = []
+    heavy = []
+    # Import the package from the parent of the repository
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env["PYTHONPATH"] = os.pathsep.join([root, env.get("PYTHONPATH", "")])
+    for i in range(repeat):
+        out = subprocess.check_output([sys.executable, "-c", _PROBE %(statement, HEAVY)],
+                                      env=env)
+        result = json.loads(out.decode("utf-8").strip().splitlines()[-1])
+        times.append(result["import"])
+        heavy = result["heavy"]
+    times.sort()
+    return times[len(times) // 2], heavy
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help="maximum median import time [s]")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of fresh interpreters per statement")
+    args = parser.parse_args()
+
+    ok = True
+    for statement in STATEMENTS:
+        median, heavy = time_import(statement, repeat=args.repeat)
+        status = "ok"
+        if median > args.budget:
+            status = "SLOW"
+            ok = False
+        if heavy:
+            status = "HEAVY (%s)" %", ".join(heavy)
+            ok = False
+        print("%-45s %7.3f s  %s" %(statement, median, status))
+
+    if not ok:
+        print("Error: import budget of %.3f s exceeded" %args.budget)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -5,25 +5,272 @@ Created on Thu Mar  3 21:44:34 2016
 @author: jlustigy
 """
 
-import matplotlib.cm as cmx
-import matplotlib.colors as colors
-import matplotlib.pylab as plt
 import numpy as np
 
-def colorize(vector,cmap='plasma', vmin=None, vmax=None):
+from ._lru_cache import LRUCache
+
+# matplotlib is imported on first use, so `import jakely` stays light
+
+__all__ = ["colorize", "colorize_lut", "fit_norm", "get_scalarmap", "get_lut"]
+
+# Supported normalization modes
+NORMS = ["linear", "percentile", "log", "symlog", "histeq"]
+
+# Maximum number of colormaps and lookup tables kept in each cache
+CACHE_SIZE = 128
+
+_cmap_cache = LRUCache(CACHE_SIZE)
+_lut_cache = LRUCache(CACHE_SIZE)
+
+def _cmap_key(cmap):
+    """Hashable cache key for a colormap name or Colormap instance"""
+    if isinstance(cmap, str):
+        return cmap
+    return ("id", id(cmap))
+
+def _get_cmap(cmap):
+    """Private copy of a colormap, resolved and sampled once per name"""
+    def make():
+        import matplotlib.pyplot as plt
+        cm = plt.get_cmap(cmap)
+        # Build the lookup table once, copies share the work
+        cm(0.0)
+        return cm
+    return _cmap_cache.get(_cmap_key(cmap), make).copy()
+
+def get_scalarmap(cmap='plasma', vmin=0.0, vmax=1.0, norm='linear', extra=None):
+    """Get a ScalarMappable and Normalize for (cmap, vmin, vmax).
+
+    Only the colormap lookup is cached. Every call returns new objects, so
+    they may be modified (e.g. by a colorbar or ``set_clim``) freely.
+
+    Parameters
+    ----------
+    cmap : str or matplotlib.colors.Colormap
+        Matplotlib Colormap (name)
+    vmin : float
+        Minimum value for color normalization
+    vmax : float
+        Maximum value for color normalization
+    norm : str
+        Normalization mode, one of `NORMS`. ``"percentile"`` is linear
+        between the given vmin and vmax
+    extra : tuple (optional)
+        Mode parameter: the linear threshold for ``"symlog"``, or the data
+        quantiles at evenly spaced levels for ``"histeq"``
+
+    Returns
+    -------
+    scalarmap : matplotlib.cm.ScalarMappable
+        ScalerMap to convert values to colors
+    cNorm : matplotlib.colors.Normalize
+        Color normalization
+    """
+    import matplotlib.cm as cmx
+    cNorm  = _make_norm(norm, vmin, vmax, extra)
+    scalarmap = cmx.ScalarMappable(norm=cNorm, cmap=_get_cmap(cmap))
+    return scalarmap, cNorm
+
+def _make_norm(norm, vmin, vmax, extra):
+    """Construct the matplotlib Normalize for a normalization mode"""
+    import matplotlib.colors as colors
+    if norm in ("linear", "percentile"):
+        return colors.Normalize(vmin=vmin, vmax=vmax)
+    elif norm == "log":
+        return colors.LogNorm(vmin=vmin, vmax=vmax)
+    elif norm == "symlog":
+        return colors.SymLogNorm(linthresh=extra, vmin=vmin, vmax=vmax)
+    elif norm == "histeq":
+        # Map each value to its (interpolated) quantile level
+        qvals = np.array(extra)
+        levels = np.linspace(0.0, 1.0, len(qvals))
+        forward = lambda x: np.interp(x, qvals, levels)
+        inverse = lambda y: np.interp(y, levels, qvals)
+        return colors.FuncNorm((forward, inverse), vmin=vmin, vmax=vmax)
+    else:
+        raise ValueError("Unknown norm '%s'. Use one of %s" %(norm, NORMS))
+
+def fit_norm(data, norm='linear', vmin=None, vmax=None, percentile=(1.0, 99.0),
+             linthresh=None, nlevels=256, chunksize=None):
+    """Compute the color normalization of some data, ignoring NaNs.
+
+    Arrays are scanned exactly. An iterable of chunks, or an array with
+    ``chunksize`` set (e.g. a `numpy.memmap`), is scanned in a single pass,
+    with quantiles approximated by a
+    `jakely.toolbox.quantile_sketch.HistogramSketch`.
+
+    Parameters
+    ----------
+    data : array or iterable
+        Values to normalize, or an iterable of array chunks
+    norm : str
+        Normalization mode:
+
+        ``"linear"``: linear between the min and max
+        ``"percentile"``: linear between the given percentiles, clipping outliers
+        ``"log"``: logarithmic between the smallest positive value and the max
+        ``"symlog"``: symmetric logarithmic, linear within +/- linthresh
+        ``"histeq"``: histogram equalization, so colors are evenly used
+    vmin, vmax : float (optional)
+        Fixed limits, overriding the ones computed from the data
+    percentile : tuple (optional)
+        Lower and upper percentile for ``"percentile"``
+    linthresh : float (optional)
+        Linear range for ``"symlog"``. Defaults to 1% of the largest absolute
+        value
+    nlevels : int (optional)
+        Number of quantile levels for ``"histeq"``
+    chunksize : int (optional)
+        Scan an array in chunks of this many values
+
+    Returns
+    -------
+    cNorm : matplotlib.colors.Normalize
+        Color normalization
+    """
+    params = _norm_params(data, norm, vmin, vmax, percentile, linthresh,
+                          nlevels, chunksize)
+    return _make_norm(*params)
+
+def _valid_values(x):
+    """Flat float array of the finite, unmasked values of x"""
+    x = np.ma.compressed(np.ma.asarray(x, dtype=float))
+    return x[np.isfinite(x)]
+
+def _norm_params(data, norm='linear', vmin=None, vmax=None, percentile=(1.0, 99.0),
+                 linthresh=None, nlevels=256, chunksize=None):
+    """(norm, vmin, vmax, extra) describing the normalization of data"""
+
+    if norm not in NORMS:
+        raise ValueError("Unknown norm '%s'. Use one of %s" %(norm, NORMS))
+
+    # Quantile levels that have to be measured
+    if norm == "percentile":
+        qs = np.array(percentile) / 100.0
+    elif norm == "histeq":
+        qs = np.linspace(0.0, 1.0, nlevels)
+    else:
+        qs = None
+
+    if chunksize is not None:
+        flat = np.reshape(data, -1)
+        data = (flat[i:i+chunksize] for i in range(0, len(flat), chunksize))
+
+    if isinstance(data, np.ndarray) or np.isscalar(data) or isinstance(data, (list, tuple)):
+        # Exact statistics of an in-memory array
+        x = _valid_values(data)
+        if len(x) == 0:
+            x = np.array([0.0, 1.0])
+        lo, hi = x.min(), x.max()
+        pos = x[x > 0]
+        minpos = pos.min() if len(pos) > 0 else np.nan
+        quants = np.quantile(x, qs) if qs is not None else None
+    else:
+        # Single pass over chunks with an approximate quantile sketch
+        from .toolbox.quantile_sketch import HistogramSketch
+        sketch = HistogramSketch(bins=4096) if qs is not None else None
+        lo, hi, minpos = np.inf, -np.inf, np.inf
+        scale = None
+        for chunk in data:
+            x = _valid_values(chunk)
+            if len(x) == 0:
+                continue
+            if scale is None:
+                # Typical magnitude, sets where the sketch turns logarithmic
+                scale = np.median(np.abs(x))
+                if scale == 0:
+                    scale = 1.0
+            lo = min(lo, x.min())
+            hi = max(hi, x.max())
+            pos = x[x > 0]
+            if len(pos) > 0:
+                minpos = min(minpos, pos.min())
+            if sketch is not None:
+                # Bin in asinh space so heavy tails keep a relative resolution
+                sketch.update(np.arcsinh(x / scale))
+        if lo > hi:
+            lo, hi = 0.0, 1.0
+        if not np.isfinite(minpos):
+            minpos = np.nan
+        if sketch is not None:
+            quants = np.clip(scale * np.sinh(sketch.quantile(qs)[0]), lo, hi)
+            quants[0] = lo if norm == "histeq" else quants[0]
+            quants[-1] = hi if norm == "histeq" else quants[-1]
+        else:
+            quants = None
+
+    extra = None
+    if norm == "percentile":
+        lo, hi = quants[0], quants[1]
+    elif norm == "log":
+        lo = minpos
+    elif norm == "symlog":
+        if linthresh is None:
+            linthresh = 0.01 * max(abs(lo), abs(hi))
+            if linthresh == 0:
+                linthresh = 1.0
+        extra = float(linthresh)
+    elif norm == "histeq":
+        # Quantiles must be non-decreasing for the interpolation
+        extra = tuple(np.maximum.accumulate(quants))
+
+    if vmin is not None: lo = vmin
+    if vmax is not None: hi = vmax
+
+    return norm, float(lo), float(hi), extra
+
+def get_lut(cmap='plasma', N=256):
+    """Get a cached uint8 RGBA lookup table for a colormap.
+
+    Parameters
+    ----------
+    cmap : str or matplotlib.colors.Colormap
+        Matplotlib Colormap (name)
+    N : int
+        Number of colors sampled across the colormap
+
+    Returns
+    -------
+    lut : np.ndarray
+        Read-only ``(N + 3, 4)`` uint8 array. Rows ``0..N-1`` span the
+        colormap, followed by the under, over and bad (NaN) colors
+    """
+    def make():
+        import matplotlib.pyplot as plt
+        cm = plt.get_cmap(cmap)
+        lut = np.empty((N + 3, 4), dtype=np.uint8)
+        lut[:N] = cm(np.linspace(0.0, 1.0, N), bytes=True)
+        lut[N] = cm(-np.inf, bytes=True)
+        lut[N+1] = cm(np.inf, bytes=True)
+        lut[N+2] = cm(np.nan, bytes=True)
+        lut.flags.writeable = False
+        # Keep the colormap alive so its id is not reused while cached
+        return lut, cm
+
+    return _lut_cache.get((_cmap_key(cmap), N), make)[0]
+
+def colorize(vector,cmap='plasma', vmin=None, vmax=None, norm='linear',
+             percentile=(1.0, 99.0), linthresh=None):
     """Convert a vector to RGBA colors.
 
     Parameters
     ----------
     vector : array
-        Array of values to be represented by relative colors     
+        Array of values to be represented by relative colors
     cmap : str (optional)
         Matplotlib Colormap name
     vmin : float (optional)
-        Minimum value for color normalization. Defaults to np.min(vector)
+        Minimum value for color normalization. Defaults to np.nanmin(vector)
     vmax : float (optional)
-        Maximum value for color normalization. Defaults to np.max(vector)
-        
+        Maximum value for color normalization. Defaults to np.nanmax(vector)
+    norm : str (optional)
+        Normalization mode: ``"linear"``, ``"percentile"``, ``"log"``,
+        ``"symlog"`` or ``"histeq"`` (see `fit_norm`)
+    percentile : tuple (optional)
+        Lower and upper percentile for ``norm="percentile"``
+    linthresh : float (optional)
+        Linear range for ``norm="symlog"``
+
     Returns
     -------
     vcolors : np.ndarray
@@ -33,14 +280,109 @@ def colorize(vector,cmap='plasma', vmin=None, vmax=None):
     cNorm : matplotlib.colors.Normalize
         Color normalization
     """
-    
-    if vmin is None: vmin = np.min(vector)
-    if vmax is None: vmax = np.max(vector)    
-    
-    cm = plt.get_cmap(cmap)
-    cNorm  = colors.Normalize(vmin=vmin, vmax=vmax)
-    scalarmap = cmx.ScalarMappable(norm=cNorm, cmap=cm)
+
+    if (norm == 'linear') and (vmin is not None) and (vmax is not None):
+        params = (norm, vmin, vmax, None)
+    else:
+        params = _norm_params(vector, norm=norm, vmin=vmin, vmax=vmax,
+                              percentile=percentile, linthresh=linthresh)
+
+    scalarmap, cNorm = get_scalarmap(cmap, params[1], params[2],
+                                     norm=params[0], extra=params[3])
     vcolors = scalarmap.to_rgba(vector)
-    
+
     return vcolors,scalarmap,cNorm
-        
+
+def colorize_lut(vector, cmap='plasma', vmin=None, vmax=None, N=256, out=None,
+                 chunksize=2**20, norm='linear', percentile=(1.0, 99.0),
+                 linthresh=None):
+    """Convert an array to uint8 RGBA colors through a precomputed lookup table.
+
+    Values are normalized and mapped to integer table indices one chunk at a
+    time, so no float64 RGBA copy of the input is ever made. Suitable for
+    very large (e.g. memory-mapped) arrays.
+
+    Parameters
+    ----------
+    vector : array
+        Array of values to be represented by relative colors
+    cmap : str (optional)
+        Matplotlib Colormap name
+    vmin : float (optional)
+        Minimum value for color normalization. Defaults to np.nanmin(vector)
+    vmax : float (optional)
+        Maximum value for color normalization. Defaults to np.nanmax(vector)
+    N : int (optional)
+        Number of colors in the lookup table
+    out : np.ndarray (optional)
+        uint8 array of shape ``vector.shape + (4,)`` to write the colors into
+    chunksize : int (optional)
+        Number of values converted at a time. Statistics needed by the
+        normalization are also gathered in one pass of this size (with
+        approximate quantiles)
+    norm : str (optional)
+        Normalization mode (see `colorize`)
+    percentile : tuple (optional)
+        Lower and upper percentile for ``norm="percentile"``
+    linthresh : float (optional)
+        Linear range for ``norm="symlog"``
+
+    Returns
+    -------
+    vcolors : np.ndarray
+        uint8 array of RGBA colors with shape ``vector.shape + (4,)``
+    """
+
+    if (norm == 'linear') and (vmin is not None) and (vmax is not None):
+        params = (norm, vmin, vmax, None)
+    else:
+        params = _norm_params(vector, norm=norm, vmin=vmin, vmax=vmax,
+                              percentile=percentile, linthresh=linthresh,
+                              chunksize=chunksize)
+    norm, vmin, vmax = params[:3]
+
+    shape = np.shape(vector)
+    if out is None:
+        out = np.empty(shape + (4,), dtype=np.uint8)
+    elif (out.shape != shape + (4,)) or (out.dtype != np.uint8):
+        raise ValueError("out must be a uint8 array of shape %s" %(shape + (4,),))
+
+    lut = get_lut(cmap, N)
+    flat = np.reshape(vector, -1)
+    flat_out = out.reshape(-1, 4)
+
+    if norm in ('linear', 'percentile'):
+        # Scale from data values to table indices
+        if vmax > vmin:
+            scale = N / (float(vmax) - float(vmin))
+        else:
+            scale = 0.0
+        cNorm = None
+    else:
+        scale = float(N)
+        cNorm = get_scalarmap(cmap, vmin, vmax, norm=norm, extra=params[3])[1]
+
+    for i in range(0, len(flat), chunksize):
+        chunk = flat[i:i+chunksize]
+        values = np.ma.getdata(chunk)
+        if cNorm is None:
+            x = np.subtract(values, vmin, dtype=float)
+        else:
+            x = np.ma.filled(cNorm(np.asarray(values, dtype=float)), np.nan)
+        x *= scale
+        # Masked values get the bad color, as in colorize
+        bad = np.isnan(x) | np.ma.getmaskarray(chunk)
+        under = x < 0
+        over = x > N
+        x[bad] = 0.0
+        idx = np.clip(x, 0, N - 1).astype(np.intp)
+        idx[under] = N
+        idx[over] = N + 1
+        idx[bad] = N + 2
+        np.take(lut, idx, axis=0, out=flat_out[i:i+chunksize])
+
+    # reshape() copies if out was not contiguous
+    if not np.shares_memory(flat_out, out):
+        out[...] = flat_out.reshape(out.shape)
+
+    return out
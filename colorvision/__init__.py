@@ -1 +1,4 @@
-from .eyecolor import eyecolor
\ No newline at end of file
+from .eyecolor import eyecolor, wav2RGB_array, rgb2hex
+from .wavelength_lut import WavelengthLUT
+from .spectral_library import load_spectrum, load_library, list_spectra
+from .response_functions import get_response, list_responses, register_response
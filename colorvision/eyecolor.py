@@ -7,6 +7,8 @@ Created on Thu Mar  3 22:43:00 2016
 
 import numpy as np
 
+from .wavelength_lut import WavelengthLUT
+
 def wav2RGB(wavelength):
     """Converts a wavelength to RGB color
     """
@@ -58,25 +60,134 @@ def wav2RGB(wavelength):
     return '#%02x%02x%02x' % tuple(tup)
 
 
-vectorize_wav2RGB = np.vectorize(wav2RGB) 
+def wav2RGB_array(wavelength, dtype=np.uint8, trunc=True):
+    """Converts an array of wavelengths to RGB colors
+
+    Vectorized version of `wav2RGB` using `numpy.select` over the whole
+    array (wavelengths are truncated to integer nanometers, as in
+    `wav2RGB`). Non-finite wavelengths are black.
+
+    Parameters
+    ----------
+    wavelength : float or array
+        Wavelength(s) in nanometers, any shape
+    dtype : numpy dtype (optional)
+        ``np.uint8`` for integer 0-255 channels (identical to `wav2RGB`) or a
+        float type for channels in [0, 1]
+    trunc : bool (optional)
+        Truncate wavelengths to integer nanometers like `wav2RGB`. Set to
+        False for the continuous color ramps
+
+    Returns
+    -------
+    rgb : np.ndarray
+        RGB colors with shape ``np.shape(wavelength) + (3,)``
+    """
+    w = np.asarray(wavelength, dtype=float)
+    w = np.where(np.isfinite(w), w, 0.0)
+    if trunc:
+        w = np.trunc(w)
+
+    # colour
+    bands = [(w >= 380) & (w < 440),
+             (w >= 440) & (w < 490),
+             (w >= 490) & (w < 510),
+             (w >= 510) & (w < 580),
+             (w >= 580) & (w < 645),
+             (w >= 645) & (w <= 780)]
+    R = np.select(bands, [-(w - 440.) / (440. - 350.), 0.0, 0.0,
+                          (w - 510.) / (580. - 510.), 1.0, 1.0], 0.0)
+    G = np.select(bands, [0.0, (w - 440.) / (490. - 440.), 1.0, 1.0,
+                          -(w - 645.) / (645. - 580.), 0.0], 0.0)
+    B = np.select(bands, [1.0, 1.0, -(w - 510.) / (510. - 490.), 0.0,
+                          0.0, 0.0], 0.0)
+
+    # intensity correction
+    SSS = np.select([(w >= 380) & (w < 420),
+                     (w >= 420) & (w <= 700),
+                     (w > 700) & (w <= 780)],
+                    [0.3 + 0.7*(w - 350) / (420 - 350),
+                     1.0,
+                     0.3 + 0.7*(780 - w) / (780 - 700)], 0.0)
+
+    if np.issubdtype(dtype, np.integer):
+        # Same operation order and int() truncation as wav2RGB
+        SSS *= 255
+    return np.stack([SSS*R, SSS*G, SSS*B], axis=-1).astype(dtype)
+
+def rgb2hex(rgb):
+    """Converts an array of RGB colors to HEX strings
 
-def eyecolor(value):
+    Parameters
+    ----------
+    rgb : array
+        Colors with shape ``(..., 3)``, either integers in 0-255 or floats in
+        [0, 1]
+
+    Returns
+    -------
+    color : np.ndarray
+        HEX strings with shape ``rgb.shape[:-1]``
+    """
+    rgb = np.asarray(rgb)
+    if not np.issubdtype(rgb.dtype, np.integer):
+        rgb = (255 * np.clip(rgb, 0.0, 1.0)).astype(int)
+    rgb = rgb.astype(np.int64)
+    value = (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+    return np.char.mod('#%06x', value)
+
+def vectorize_wav2RGB(wavelength):
+    """Converts an array of wavelengths to HEX colors (see `wav2RGB`)
+    """
+    return rgb2hex(wav2RGB_array(wavelength))
+
+# Lookup table of the continuous wav2RGB color ramps, built on first use
+wav2RGB_lut = WavelengthLUT(lambda wl: wav2RGB_array(wl, dtype=float, trunc=False),
+                            350., 800., resolution=0.1)
+
+def eyecolor(value, output="hex", lut=None):
     """Converts a wavelength in nanometers to RGB colors in HEX
-    
+
     Parameters
     ----------
     value : float, int, or array
         Wavelength in nanometers
-    
+    output : str (optional)
+        ``"hex"`` for HEX strings, ``"uint8"`` for integer RGB channels in
+        0-255, or ``"float"`` for RGB channels in [0, 1]
+    lut : bool or WavelengthLUT (optional)
+        Interpolate colors from a precomputed lookup table instead of
+        evaluating `wav2RGB` (``True`` uses the 0.1 nm `wav2RGB_lut`). This is
+        much faster for large arrays and does not truncate wavelengths
+
     Returns
     -------
     color : str or array
-        String of HEX colors
+        String of HEX colors, or array of RGB colors with a trailing axis of
+        length 3
     """
-    try:
-        lb = len(value)
-        color = vectorize_wav2RGB(value)
-        return color
-    except TypeError:
-        color =  wav2RGB(value)
-        return color
\ No newline at end of file
+    if output not in ("hex", "uint8", "float"):
+        raise ValueError("output must be 'hex', 'uint8' or 'float'")
+
+    if lut is None or lut is False:
+        if output == "hex":
+            if np.ndim(value) == 0:
+                return wav2RGB(value)
+            return vectorize_wav2RGB(value)
+        elif output == "uint8":
+            return wav2RGB_array(value, dtype=np.uint8)
+        else:
+            return wav2RGB_array(value, dtype=float)
+
+    if lut is True:
+        lut = wav2RGB_lut
+    rgb = lut(value)
+    if output == "float":
+        return rgb
+    irgb = (255 * rgb).astype(np.uint8)
+    if output == "uint8":
+        return irgb
+    color = rgb2hex(irgb)
+    if np.ndim(value) == 0:
+        return str(color)
+    return color
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Registry of the eye response functions in colorvision/eye_response_functions.
+
+Each table is parsed once (through the `spectral_library` binary cache, so
+later processes memory-map it) and kept as read-only arrays.
+
+@author: jlustigy
+"""
+
+import os
+
+from .spectral_library import load_spectrum
+
+__all__ = ["RESPONSE_DIR", "RESPONSE_FUNCTIONS", "get_response",
+           "list_responses", "register_response"]
+
+# Directory of the response function tables shipped with jakely
+RESPONSE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "eye_response_functions")
+
+# name : (file, description)
+RESPONSE_FUNCTIONS = {
+    "cie1931" : ("ciexyz31.csv",
+                 "CIE 1931 2-deg xyz color matching functions, 5 nm"),
+    "cie1931_1nm" : ("ciexyz31_1.csv",
+                     "CIE 1931 2-deg xyz color matching functions, 1 nm"),
+    "lms_10deg" : ("linss10e_fine.csv",
+                   "Stockman & Sharpe (2000) 10-deg LMS cone fundamentals, 0.1 nm"),
+    "lms_2deg" : ("linss2_10e_fine.csv",
+                  "Stockman & Sharpe (2000) 2-deg LMS cone fundamentals, 0.1 nm"),
+}
+
+_responses = {}
+
+def register_response(name, filename, description=""):
+    """
+    Add a response function table to the registry.
+
+    Parameters
+    ----------
+    name : str
+        Name to look the table up by
+    filename : str
+        CSV file with wavelength [nm] in the first column and one column per
+        response, either in `RESPONSE_DIR` or a path
+    description : str (optional)
+        Short description
+    """
+    RESPONSE_FUNCTIONS[name] = (filename, description)
+    _responses.pop(name, None)
+
+def list_responses():
+    """
+    Names and descriptions of the registered response functions.
+
+    Returns
+    -------
+    responses : dict
+    """
+    return dict([(name, desc) for name, (fn, desc) in RESPONSE_FUNCTIONS.items()])
+
+def get_response(name):
+    """
+    Get a response function table by name, loading it on first use.
+
+    Parameters
+    ----------
+    name : str
+        One of `list_responses()` (e.g. ``"cie1931_1nm"`` or ``"lms_2deg"``)
+
+    Returns
+    -------
+    wl : np.ndarray
+        Wavelength grid [nm], read-only
+    response : np.ndarray
+        Read-only array of shape ``(len(wl), nresponse)``, e.g. x, y, z or
+        L, M, S
+    """
+    if name not in _responses:
+        if name not in RESPONSE_FUNCTIONS:
+            raise ValueError("Unknown response function '%s'. Use one of %s"
+                             %(name, sorted(RESPONSE_FUNCTIONS)))
+        fn = RESPONSE_FUNCTIONS[name][0]
+        if not os.path.exists(fn):
+            fn = os.path.join(RESPONSE_DIR, fn)
+        data = load_spectrum(fn)
+        _responses[name] = (data[:,0], data[:,1:])
+    return _responses[name]
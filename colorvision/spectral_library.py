@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Loader for the spectra in colorvision/spectra, with a binary cache.
+
+The text files come with many different headers (USGS splib06a, JHU,
+``#`` comments, free-form memos, ``;`` filler lines), so data rows are
+detected instead of skipped by count. Parsed tables are cached as ``.npy``
+files and memory-mapped on later loads.
+
+@author: jlustigy
+"""
+
+import os
+import json
+import hashlib
+
+import numpy as np
+
+__all__ = ["SPECTRA_DIR", "parse_spectrum", "load_spectrum", "load_library",
+           "list_spectra", "clear_cache"]
+
+# Directory of the spectra shipped with jakely
+SPECTRA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "spectra")
+
+# Bump when the parsed format changes, to invalidate old cache files
+CACHE_VERSION = 1
+
+# Cache location, override with the JAKELY_CACHE_DIR environment variable
+CACHE_DIR = os.path.join(os.environ.get("JAKELY_CACHE_DIR",
+                                        os.path.join(os.path.expanduser("~"),
+                                                     ".cache", "jakely")),
+                         "spectra")
+
+# USGS marker for deleted values
+DELETED_VALUE = -1.23e34
+
+# Spectrum file extensions
+EXTENSIONS = (".alb", ".txt", ".dat")
+
+def _row(line):
+    """Floats of a data line, or None for header/comment lines"""
+    tokens = line.replace(",", " ").split()
+    if len(tokens) < 2:
+        return None
+    try:
+        return [float(t) for t in tokens]
+    except ValueError:
+        return None
+
+def parse_spectrum(path):
+    """
+    Parse a spectrum text file, auto-detecting its header and columns.
+
+    Data rows are the lines made only of numbers, with the most common number
+    of columns among them. Everything else is returned as the header. USGS
+    deleted values (-1.23e34) become NaN.
+
+    Parameters
+    ----------
+    path : str
+        Spectrum file
+
+    Returns
+    -------
+    data : np.ndarray
+        Array of shape ``(nrows, ncolumns)``, first column is wavelength
+    header : list
+        Non-data lines
+    """
+    with open(path, "r") as f:
+        lines = f.read().splitlines()
+
+    rows = [_row(line) for line in lines]
+    ncols = [len(r) for r in rows if r is not None]
+    if len(ncols) == 0:
+        raise ValueError("No data found in %s" %path)
+    ncol = np.bincount(ncols).argmax()
+
+    data = np.array([r for r in rows if r is not None and len(r) == ncol])
+    header = [line for line, r in zip(lines, rows) if r is None or len(r) != ncol]
+
+    # Missing values
+    data[data <= 0.1 * DELETED_VALUE] = np.nan
+
+    return data, header
+
+def _cache_paths(path):
+    """(data, metadata) cache file names for a spectrum file"""
+    key = hashlib.sha1(("%i:%s" %(CACHE_VERSION, os.path.abspath(path))).encode("utf-8"))
+    base = os.path.join(CACHE_DIR, "%s_%s" %(os.path.basename(path), key.hexdigest()[:16]))
+    return base + ".npy", base + ".json"
+
+def _file_hash(path):
+    """sha1 of a file's contents"""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _write_cache(path, data, header, npy, meta):
+    """Atomically write the cache files, silently skipped if not writable"""
+    st = os.stat(path)
+    info = {"version" : CACHE_VERSION, "mtime" : st.st_mtime_ns,
+            "size" : st.st_size, "sha1" : _file_hash(path), "header" : header}
+    try:
+        if not os.path.isdir(CACHE_DIR):
+            os.makedirs(CACHE_DIR)
+        # Temporary names unique per process, so concurrent writers never
+        # share a half-written file
+        tmp = npy + ".%i.tmp" %os.getpid()
+        with open(tmp, "wb") as f:
+            np.save(f, data)
+        os.replace(tmp, npy)
+        tmp = meta + ".%i.tmp" %os.getpid()
+        with open(tmp, "w") as f:
+            json.dump(info, f)
+        os.replace(tmp, meta)
+    except OSError:
+        pass
+
+def _read_meta(meta):
+    try:
+        with open(meta, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def load_spectrum(name, cache=True, mmap=True, return_header=False):
+    """
+    Load a spectrum, from the binary cache when it is up to date.
+
+    The cache is valid while the file's mtime and size are unchanged; if only
+    the mtime changed, the contents are hashed and compared before
+    re-parsing.
+
+    Parameters
+    ----------
+    name : str
+        File name in `SPECTRA_DIR` (e.g. ``"snow.alb"``) or a path
+    cache : bool (optional)
+        Use and update the cache
+    mmap : bool (optional)
+        Memory-map cached arrays (read-only)
+    return_header : bool (optional)
+        Also return the header lines
+
+    Returns
+    -------
+    data : np.ndarray
+        Array of shape ``(nrows, ncolumns)``, first column is wavelength
+    header : list
+        Header lines, if return_header
+    """
+    path = name
+    if not os.path.exists(path):
+        path = os.path.join(SPECTRA_DIR, name)
+
+    if not cache:
+        data, header = parse_spectrum(path)
+        return (data, header) if return_header else data
+
+    npy, meta = _cache_paths(path)
+    info = _read_meta(meta)
+    st = os.stat(path)
+
+    fresh = (info is not None) and (info.get("version") == CACHE_VERSION) \
+            and os.path.exists(npy)
+    if fresh and (info["mtime"] != st.st_mtime_ns or info["size"] != st.st_size):
+        # Touched but maybe not modified
+        fresh = (info["size"] == st.st_size) and (info["sha1"] == _file_hash(path))
+        if fresh:
+            info["mtime"] = st.st_mtime_ns
+            try:
+                with open(meta, "w") as f:
+                    json.dump(info, f)
+            except OSError:
+                pass
+
+    if fresh:
+        data = np.load(npy, mmap_mode="r" if mmap else None)
+        header = info["header"]
+    else:
+        data, header = parse_spectrum(path)
+        _write_cache(path, data, header, npy, meta)
+        data.setflags(write=False)
+
+    return (data, header) if return_header else data
+
+def list_spectra(directory=None):
+    """
+    Names of the spectrum files in a directory.
+
+    Parameters
+    ----------
+    directory : str (optional)
+        Defaults to `SPECTRA_DIR`
+
+    Returns
+    -------
+    names : list
+    """
+    if directory is None:
+        directory = SPECTRA_DIR
+    return sorted([f for f in os.listdir(directory) if f.endswith(EXTENSIONS)])
+
+def load_library(directory=None, **kwargs):
+    """
+    Load every spectrum in a directory (see `load_spectrum`).
+
+    Parameters
+    ----------
+    directory : str (optional)
+        Defaults to `SPECTRA_DIR`
+
+    Returns
+    -------
+    library : dict
+        Arrays keyed by file name without extension
+    """
+    if directory is None:
+        directory = SPECTRA_DIR
+    return dict([(os.path.splitext(f)[0], load_spectrum(os.path.join(directory, f), **kwargs))
+                 for f in list_spectra(directory)])
+
+def clear_cache():
+    """Delete all cached spectra"""
+    if not os.path.isdir(CACHE_DIR):
+        return
+    for f in os.listdir(CACHE_DIR):
+        if f.endswith((".npy", ".json")):
+            os.remove(os.path.join(CACHE_DIR, f))
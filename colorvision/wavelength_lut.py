@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Precomputed wavelength to color lookup tables.
+
+@author: jlustigy
+"""
+
+import numpy as np
+
+__all__ = ["WavelengthLUT"]
+
+class WavelengthLUT(object):
+    """
+    Lookup table of colors sampled on a regular wavelength grid.
+
+    The table is evaluated from ``func`` on first use and then reused, so
+    coloring any number of wavelengths is an indexed gather (plus a linear
+    interpolation between neighbouring samples).
+
+    Parameters
+    ----------
+    func : callable
+        Maps an array of wavelengths [nm] to an array of colors with shape
+        ``(len(wl), nchannel)``
+    wlmin : float
+        Minimum wavelength of the table [nm]
+    wlmax : float
+        Maximum wavelength of the table [nm]
+    resolution : float (optional)
+        Wavelength step of the table [nm]
+    fill : float (optional)
+        Color channel value outside of [wlmin, wlmax] and for NaNs
+
+    Example
+    -------
+    >>> lut = WavelengthLUT(func, 380., 780., resolution=0.1)
+    >>> rgb = lut(wl_cube)
+    """
+
+    def __init__(self, func, wlmin, wlmax, resolution=0.1, fill=0.0):
+        self.func = func
+        self.wlmin = float(wlmin)
+        self.resolution = float(resolution)
+        self.n = int(np.ceil((float(wlmax) - self.wlmin) / self.resolution - 1e-9)) + 1
+        self.wlmax = self.wlmin + (self.n - 1) * self.resolution
+        self.fill = fill
+        self._table = None
+
+    @property
+    def wl(self):
+        """Wavelength grid of the table [nm]"""
+        return self.wlmin + self.resolution * np.arange(self.n)
+
+    @property
+    def table(self):
+        """Read-only color table, built on first access"""
+        if self._table is None:
+            table = np.array(self.func(self.wl), dtype=float)
+            # Extra row holding the fill color
+            table = np.vstack([table, np.full((1, table.shape[1]), self.fill)])
+            table.setflags(write=False)
+            self._table = table
+        return self._table
+
+    def __call__(self, wavelength, interpolate=True, out=None, chunksize=2**20):
+        """
+        Colors of an array of wavelengths.
+
+        Parameters
+        ----------
+        wavelength : float or array
+            Wavelengths [nm], any shape
+        interpolate : bool (optional)
+            Interpolate linearly between table samples, otherwise take the
+            nearest sample
+        out : np.ndarray (optional)
+            Array of shape ``np.shape(wavelength) + (nchannel,)`` to fill
+        chunksize : int (optional)
+            Number of wavelengths converted at a time
+
+        Returns
+        -------
+        colors : np.ndarray
+            Colors with shape ``np.shape(wavelength) + (nchannel,)``
+        """
+        table = self.table
+        nchan = table.shape[1]
+        shape = np.shape(wavelength)
+        if out is None:
+            out = np.empty(shape + (nchan,))
+        flat = np.reshape(wavelength, -1)
+        flat_out = out.reshape(-1, nchan)
+
+        for i in range(0, len(flat), chunksize):
+            pos = (np.asarray(flat[i:i+chunksize], dtype=float) - self.wlmin) / self.resolution
+            # NaN and out of range positions are pointed at the fill row
+            bad = ~((pos >= 0) & (pos <= self.n - 1))
+            pos[bad] = 0.0
+            if interpolate:
+                lo = np.minimum(pos.astype(np.intp), self.n - 2)
+                frac = (pos - lo)[:, None]
+                lo[bad] = self.n
+                hi = np.where(bad, self.n, lo + 1)
+                flat_out[i:i+chunksize] = (1.0 - frac) * table[lo] + frac * table[hi]
+            else:
+                idx = np.rint(pos).astype(np.intp)
+                idx[bad] = self.n
+                np.take(table, idx, axis=0, out=flat_out[i:i+chunksize])
+
+        # reshape() copies if out was not contiguous
+        if not np.shares_memory(flat_out, out):
+            out[...] = flat_out.reshape(out.shape)
+
+        return out
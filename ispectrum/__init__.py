@@ -1,2 +1,7 @@
-from .colorpy_wrapper import irgb_string_from_spectrum, make_color_swatch, \
+from .colorpy_wrapper import irgb_string_from_spectrum, irgb_string_from_spectra, \
+    make_color_swatch, \
     plot_response, rgb_from_wavelength, plot_spectrum
+from .cie import xyz_from_spectra, rgb_from_spectra
+from .resample import SpectralResampler, get_resampler
+from .batch import render_spectra
+from .stellar import list_stars, stellar_flux, weight_spectrum
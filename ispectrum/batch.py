@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Headless batch rendering of `plot_spectrum` figures.
+
+@author: jlustigy
+"""
+
+import os
+import time
+import multiprocessing
+
+import numpy as np
+
+__all__ = ["render_spectra"]
+
+def _init_worker():
+    """Use the non-interactive Agg backend in worker processes"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    plt.switch_backend("Agg")
+
+def _render_one(job):
+    """Render one spectrum to a file, returning (index, seconds, error)"""
+    import matplotlib.pyplot as plt
+    from .colorpy_wrapper import plot_spectrum
+    from ..colorvision.spectral_library import load_spectrum
+
+    i, spectrum, output, wl_scale, savefig_kw, kwargs = job
+    t0 = time.time()
+    fig = None
+    try:
+        if isinstance(spectrum, str):
+            data = load_spectrum(spectrum)
+            wl = data[:,0] * wl_scale
+            flux = np.array(data[:,1])
+            kwargs.setdefault("title", os.path.splitext(os.path.basename(spectrum))[0])
+        else:
+            wl, flux = spectrum
+            wl = np.asarray(wl, dtype=float)
+            flux = np.asarray(flux, dtype=float)
+        fig = plot_spectrum(wl, flux, **kwargs)
+        fig.savefig(output, **savefig_kw)
+        error = None
+    except Exception as e:
+        error = "%s: %s" %(type(e).__name__, e)
+    finally:
+        # Free the figure and its pyplot state even on failure
+        if fig is not None:
+            plt.close(fig)
+    return i, time.time() - t0, error
+
+def render_spectra(spectra, outputs, processes=None, wl_scale=1000.0,
+                   maxtasksperchild=100, savefig_kw=None, verbose=False,
+                   **kwargs):
+    """
+    Render `plot_spectrum` figures for many spectra with a process pool.
+
+    Workers use the Agg backend and close every figure after saving it, and
+    are replaced after ``maxtasksperchild`` figures, so memory stays flat.
+
+    Parameters
+    ----------
+    spectra : list
+        Spectrum file paths (read with
+        `jakely.colorvision.spectral_library.load_spectrum`, first column
+        wavelength, second column intensity) or ``(wl [nm], spectrum)``
+        array pairs
+    outputs : list
+        Output file name of each figure
+    processes : int (optional)
+        Number of worker processes, defaults to the number of CPUs. With
+        ``processes=1`` figures are rendered in this process, which uses the
+        Agg backend while rendering
+    wl_scale : float (optional)
+        Factor converting file wavelengths to nm (default microns to nm)
+    maxtasksperchild : int (optional)
+        Figures rendered by a worker before it is replaced
+    savefig_kw : dict (optional)
+        Keyword arguments for `matplotlib.figure.Figure.savefig`
+    verbose : bool (optional)
+        Print the timing of every figure as it finishes
+    **kwargs
+        Passed to `plot_spectrum`. The title defaults to the file name
+
+    Returns
+    -------
+    timing : list
+        ``(output, seconds, error)`` for each spectrum in input order, where
+        error is None on success or the exception message
+    """
+    if len(spectra) != len(outputs):
+        raise ValueError("spectra and outputs must have the same length")
+    if savefig_kw is None:
+        savefig_kw = {}
+
+    jobs = [(i, spec, out, wl_scale, savefig_kw, dict(kwargs))
+            for i, (spec, out) in enumerate(zip(spectra, outputs))]
+
+    timing = [None] * len(jobs)
+
+    def collect(result):
+        i, dt, error = result
+        timing[i] = (outputs[i], dt, error)
+        if verbose:
+            if error is None:
+                print("%s: %.2f s" %(outputs[i], dt))
+            else:
+                print("Error: %s failed (%s)" %(outputs[i], error))
+
+    if processes == 1:
+        # Render headless here too, then restore the previous backend
+        import matplotlib
+        import matplotlib.pyplot as plt
+        backend = matplotlib.get_backend()
+        _init_worker()
+        try:
+            for job in jobs:
+                collect(_render_one(job))
+        finally:
+            plt.switch_backend(backend)
+        return timing
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    chunksize = max(1, min(16, len(jobs) // (4 * processes)))
+
+    pool = multiprocessing.Pool(processes, initializer=_init_worker,
+                                maxtasksperchild=maxtasksperchild)
+    try:
+        for result in pool.imap_unordered(_render_one, jobs, chunksize=chunksize):
+            collect(result)
+    finally:
+        pool.close()
+        pool.join()
+
+    return timing
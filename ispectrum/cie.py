@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+NumPy implementation of the CIE 1931 color pipeline used by ColorPy
+(wavelength -> xyz -> linear sRGB -> displayable irgb), operating on whole
+arrays at once. Results match ``colorpy.ciexyz`` and ``colorpy.colormodels``
+with their default settings (sRGB phosphors, D65 white point, sRGB gamma and
+``CLIP_ADD_WHITE`` clipping).
+
+@author: jlustigy
+"""
+
+import numpy as np
+
+from ..colorvision.response_functions import get_response
+
+__all__ = ["cmf_table", "xyz_from_wavelength", "xyz_from_spectrum",
+           "xyz_from_spectra", "rgb_from_spectra", "rgb_from_xyz",
+           "xyz_from_rgb", "irgb_from_rgb", "irgb_string_from_irgb",
+           "irgb_string_from_rgb", "irgb_string_from_xyz"]
+
+# Same default as ColorPy
+DEFAULT_DISPLAY_INTENSITY = 1.624
+
+# Wavelength range of the CIE table [nm]
+START_WL_NM = 360
+END_WL_NM = 830
+
+_cmf = None
+
+def _xyz_color(x, y):
+    """xyz color from chromaticity x, y with x+y+z = 1"""
+    return np.array([x, y, 1.0 - (x + y)])
+
+def _init_rgb_matrices(red, green, blue, white):
+    """xyz <-> rgb matrices for the given phosphor and white chromaticities"""
+    phosphor_matrix = np.column_stack((red, green, blue))
+    # Normalize white point to Y=1
+    white = white / white[1]
+    intensities = np.linalg.solve(phosphor_matrix, white)
+    xyz_from_rgb_matrix = phosphor_matrix * intensities
+    rgb_from_xyz_matrix = np.linalg.inv(xyz_from_rgb_matrix)
+    return xyz_from_rgb_matrix, rgb_from_xyz_matrix
+
+# sRGB phosphors and D65 white point
+XYZ_FROM_RGB, RGB_FROM_XYZ = _init_rgb_matrices(_xyz_color(0.640, 0.330),
+                                                _xyz_color(0.300, 0.600),
+                                                _xyz_color(0.150, 0.060),
+                                                _xyz_color(0.3127, 0.3290))
+
+def cmf_table():
+    """
+    Scaled CIE 1931 color matching functions, loaded on first use.
+
+    The 1 nm table is padded with zeros at 359 and 831 nm and scaled like
+    ColorPy (``ciexyz.init``), so that a flat spectrum on the 1 nm grid whose
+    total intensity equals DEFAULT_DISPLAY_INTENSITY has Y = 1. A flat
+    spectrum of unit intensity per sample has Y = num_wl /
+    DEFAULT_DISPLAY_INTENSITY (about 290).
+
+    Returns
+    -------
+    wl : np.ndarray
+        Wavelengths [nm], 359 to 831
+    xyz : np.ndarray
+        Read-only array of shape ``(len(wl), 3)``
+    """
+    global _cmf
+    if _cmf is None:
+        table_wl, table_xyz = get_response("cie1931_1nm")
+        num_wl = len(table_wl)
+        wl = np.concatenate([[START_WL_NM - 1], table_wl, [END_WL_NM + 1]])
+        xyz = np.vstack([np.zeros(3), table_xyz, np.zeros(3)])
+        # Trapezoid integral with a 1 nm step
+        integral = np.sum(0.5 * (xyz[1:] + xyz[:-1]), axis=0)
+        xyz *= num_wl / (integral[1] * DEFAULT_DISPLAY_INTENSITY)
+        wl.setflags(write=False)
+        xyz.setflags(write=False)
+        _cmf = (wl, xyz)
+    return _cmf
+
+def xyz_from_wavelength(wl):
+    """
+    xyz colors of unit intensity at each wavelength, interpolated linearly
+    within the 1 nm table. Wavelengths outside 359-831 nm are black.
+
+    Parameters
+    ----------
+    wl : float or array
+        Wavelength(s) [nm]
+
+    Returns
+    -------
+    xyz : np.ndarray
+        Array of shape ``np.shape(wl) + (3,)``
+    """
+    table_wl, table_xyz = cmf_table()
+    wl = np.asarray(wl, dtype=float)
+    int_wl = np.floor(wl)
+    frac = (wl - int_wl)[..., None]
+    good = (int_wl >= START_WL_NM - 1) & (int_wl <= END_WL_NM + 1)
+    index = np.where(good, int_wl - (START_WL_NM - 1), 0).astype(np.intp)
+    # Next sample, the last padded zero pairs with itself
+    upper = np.minimum(index + 1, len(table_wl) - 1)
+    xyz = table_xyz[index] + frac * (table_xyz[upper] - table_xyz[index])
+    xyz[~good] = 0.0
+    return xyz
+
+def xyz_from_spectrum(wl, spectrum):
+    """
+    xyz color of a spectrum, the intensity-weighted sum of the xyz colors of
+    its wavelengths (as in ColorPy, the wavelength grid can be arbitrary).
+
+    Parameters
+    ----------
+    wl : array
+        Wavelength grid [nm]
+    spectrum : array
+        Intensity at each wavelength
+
+    Returns
+    -------
+    xyz : np.ndarray
+        xyz color, shape ``(3,)``
+    """
+    return np.dot(np.asarray(spectrum, dtype=float), xyz_from_wavelength(wl))
+
+def xyz_from_spectra(wl, spectra, chunksize=4096):
+    """
+    xyz colors of many spectra on a shared wavelength grid, computed as one
+    matrix product with the color matching functions. Non-finite intensities
+    get zero weight, the same as dropping them from each spectrum.
+
+    Parameters
+    ----------
+    wl : array
+        Wavelength grid [nm], length ``n_wavelengths``
+    spectra : array
+        Intensities with shape ``(n_spectra, n_wavelengths)``, or a single
+        spectrum of shape ``(n_wavelengths,)``
+    chunksize : int (optional)
+        Number of spectra multiplied at a time, which bounds the size of the
+        NaN-masked copy
+
+    Returns
+    -------
+    xyz : np.ndarray
+        Array of shape ``(n_spectra, 3)`` (or ``(3,)`` for one spectrum)
+    """
+    cmf = xyz_from_wavelength(wl)
+    if np.ndim(spectra) == 1:
+        return xyz_from_spectra(wl, np.reshape(spectra, (1, -1)), chunksize)[0]
+
+    nspec = np.shape(spectra)[0]
+    xyz = np.empty((nspec, 3))
+    for i in range(0, nspec, chunksize):
+        block = np.array(spectra[i:i+chunksize], dtype=float)
+        block[~np.isfinite(block)] = 0.0
+        np.dot(block, cmf, out=xyz[i:i+chunksize])
+    return xyz
+
+def rgb_from_spectra(wl, spectra, return_hex=False, chunksize=4096):
+    """
+    Perceived linear rgb colors of many spectra on a shared wavelength grid.
+
+    Parameters
+    ----------
+    wl : array
+        Wavelength grid [nm], length ``n_wavelengths``
+    spectra : array
+        Intensities with shape ``(n_spectra, n_wavelengths)``. NaNs are ignored
+    return_hex : bool (optional)
+        Also return the clipped, displayable hex string of each color
+    chunksize : int (optional)
+        Number of spectra multiplied at a time
+
+    Returns
+    -------
+    rgb : np.ndarray
+        Linear rgb colors with shape ``(n_spectra, 3)``
+    irgb_string : np.ndarray
+        Hex strings with shape ``(n_spectra,)``, if return_hex
+    """
+    rgb = rgb_from_xyz(xyz_from_spectra(wl, spectra, chunksize=chunksize))
+    if return_hex:
+        return rgb, irgb_string_from_rgb(rgb)
+    return rgb
+
+def rgb_from_xyz(xyz):
+    """
+    Convert xyz colors to linear rgb.
+
+    Parameters
+    ----------
+    xyz : array
+        Colors with shape ``(..., 3)``
+
+    Returns
+    -------
+    rgb : np.ndarray
+        Colors with shape ``(..., 3)``
+    """
+    return np.dot(np.asarray(xyz, dtype=float), RGB_FROM_XYZ.T)
+
+def xyz_from_rgb(rgb):
+    """
+    Convert linear rgb colors to xyz.
+
+    Parameters
+    ----------
+    rgb : array
+        Colors with shape ``(..., 3)``
+
+    Returns
+    -------
+    xyz : np.ndarray
+        Colors with shape ``(..., 3)``
+    """
+    return np.dot(np.asarray(rgb, dtype=float), XYZ_FROM_RGB.T)
+
+def _srgb_gamma_invert(x):
+    """sRGB standard for gamma inverse correction"""
+    return np.where(x <= 0.00304, 12.92 * x,
+                    1.055 * np.power(np.maximum(x, 0.00304), 1.0/2.4) - 0.055)
+
+def irgb_from_rgb(rgb):
+    """
+    Convert linear rgb colors (nominal range 0-1) into displayable integer
+    colors (0-255). Out of gamut colors are desaturated by adding white,
+    too bright colors are scaled down, then sRGB gamma is applied.
+
+    Parameters
+    ----------
+    rgb : array
+        Colors with shape ``(..., 3)``
+
+    Returns
+    -------
+    irgb : np.ndarray
+        Integer colors with shape ``(..., 3)``
+    """
+    rgb = np.array(rgb, dtype=float)
+
+    # Add white to remove negative components, keeping a positive maximum
+    # (the condition rgb_max > 0 is the one of ColorPy's clip_rgb_color)
+    rgb_min = np.minimum(rgb.min(axis=-1, keepdims=True), 0.0)
+    rgb_max = rgb.max(axis=-1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scaling = np.where(rgb_max > 0.0, rgb_max / (rgb_max - rgb_min), 1.0)
+    rgb = np.where(rgb_min < 0.0, scaling * (rgb - rgb_min), rgb)
+
+    # Scale down colors brighter than the display
+    intensity_cutoff = 1.0 + (0.5 / 255.0)
+    rgb_max = rgb.max(axis=-1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rgb = np.where(rgb_max > intensity_cutoff, rgb * (intensity_cutoff / rgb_max), rgb)
+
+    rgb = _srgb_gamma_invert(rgb)
+
+    # Round half away from zero, like Python 2 round()
+    irgb = np.sign(rgb) * np.floor(np.abs(255.0 * rgb) + 0.5)
+    return np.clip(irgb, 0, 255).astype(int)
+
+def irgb_string_from_irgb(irgb):
+    """
+    Convert displayable integer colors (0-255) into hex strings.
+
+    Parameters
+    ----------
+    irgb : array
+        Integer colors with shape ``(..., 3)``
+
+    Returns
+    -------
+    irgb_string : str or np.ndarray
+        Hex string(s) like ``'#AB13D2'`` with shape ``irgb.shape[:-1]``
+    """
+    irgb = np.clip(np.asarray(irgb), 0, 255).astype(np.int64)
+    value = (irgb[..., 0] << 16) | (irgb[..., 1] << 8) | irgb[..., 2]
+    irgb_string = np.char.mod('#%06X', value)
+    if np.ndim(irgb_string) == 0:
+        return str(irgb_string)
+    return irgb_string
+
+def irgb_string_from_rgb(rgb):
+    """
+    Clip linear rgb colors, convert to displayable colors and then to hex
+    strings.
+
+    Parameters
+    ----------
+    rgb : array
+        Colors with shape ``(..., 3)``
+
+    Returns
+    -------
+    irgb_string : str or np.ndarray
+        Hex string(s) with shape ``rgb.shape[:-1]``
+    """
+    return irgb_string_from_irgb(irgb_from_rgb(rgb))
+
+def irgb_string_from_xyz(xyz):
+    """
+    Convert xyz colors directly into displayable hex strings.
+
+    Parameters
+    ----------
+    xyz : array
+        Colors with shape ``(..., 3)``
+
+    Returns
+    -------
+    irgb_string : str or np.ndarray
+        Hex string(s) with shape ``xyz.shape[:-1]``
+    """
+    return irgb_string_from_rgb(rgb_from_xyz(xyz))
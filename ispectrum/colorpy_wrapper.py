@@ -1,9 +1,14 @@
-from colorpy import colormodels, ciexyz
 from ..plot import set_figure_colors
+from . import cie
+from . import stellar
+from ..toolbox.decimate import m4_indices
+from ..colorvision.wavelength_lut import WavelengthLUT
+from ..colorvision.response_functions import get_response
 import numpy as np
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 from matplotlib import gridspec
+from matplotlib.collections import PolyCollection
 import os
 
 def irgb_string_from_spectrum(wl, spectrum):
@@ -15,12 +20,30 @@ def irgb_string_from_spectrum(wl, spectrum):
     ifin = np.isfinite(spectrum)
     wl = wl[ifin]
     spectrum = spectrum[ifin]
-    # Run through ColorPy
-    spec = np.vstack([wl, spectrum]).T
-    rgb_eye = colormodels.irgb_string_from_rgb (
-        colormodels.rgb_from_xyz (ciexyz.xyz_from_spectrum (spec)))
+    # Run through the CIE color pipeline
+    rgb_eye = cie.irgb_string_from_xyz (cie.xyz_from_spectrum (wl, spectrum))
     return rgb_eye
 
+def irgb_string_from_spectra(wl, spectra):
+    """
+    Calculates the irgb colors of many wavelengh [nm] vs intensity
+    [W/m*m/um] spectra on a shared grid, as one matrix product. NaNs are
+    ignored.
+
+    Parameters
+    ----------
+    wl : array
+        Wavelength grid [nm]
+    spectra : array
+        Intensities with shape ``(n_spectra, len(wl))``
+
+    Returns
+    -------
+    np.ndarray
+        Hex color strings with shape ``(n_spectra,)``
+    """
+    return cie.rgb_from_spectra(wl, spectra, return_hex=True)[1]
+
 def make_color_swatch(**kwargs):
     """
     Generates a little rectangular swatch of the color given. Note that this
@@ -36,19 +59,19 @@ def make_color_swatch(**kwargs):
     plt.axis('off')
     return fig
 
-def plot_response(ax=None, wlmin=350, wlmax=750, **kwargs):
+def plot_response(ax=None, wlmin=350, wlmax=750, response="cie1931_1nm", **kwargs):
     """
     Adds human eye response curves to an axis.
+
+    The curves are taken from the `jakely.colorvision.response_functions`
+    registry by name (e.g. ``"cie1931_1nm"`` or ``"lms_2deg"``).
     """
-    relpath = "../colorvision/eye_response_functions/ciexyz31_1.csv"
-    fn = os.path.join(os.path.dirname(__file__), relpath)
-    data = np.genfromtxt(fn, delimiter=',')
-    wl = data[:,0]
+    wl, data = get_response(response)
     mask = (wl >= wlmin) & (wl <= wlmax)
     wl = wl[mask]
-    x = data[mask,1]
-    y = data[mask,2]
-    z = data[mask,3]
+    x = data[mask,0]
+    y = data[mask,1]
+    z = data[mask,2]
 
     yscale = 1.0
 
@@ -68,16 +91,39 @@ def plot_response(ax=None, wlmin=350, wlmax=750, **kwargs):
     ax.plot(wl,z, color='white', label=r'z', alpha=1, lw=2.0)
 
 
-def rgb_from_wavelength(wl):
+def _rgb_from_wavelength_exact(wl):
+    """
+    Unscaled rgb colors for each wavelength [nm]
+    """
+    return cie.rgb_from_xyz (cie.xyz_from_wavelength (wl))
+
+# Lookup table of unscaled rgb colors across the CIE range, built on first use.
+# The CIE tables are interpolated linearly at 1 nm, so the interpolated table
+# reproduces them exactly.
+rgb_lut = WavelengthLUT(_rgb_from_wavelength_exact, 359., 832., resolution=0.1)
+
+def rgb_from_wavelength(wl, lut=True):
     """
     Get rgb colors for each wavelength [nm]
+
+    Parameters
+    ----------
+    wl : array
+        Wavelength grid [nm]
+    lut : bool
+        Gather from the precomputed `rgb_lut` instead of evaluating the CIE
+        color matching functions
+
+    Returns
+    -------
+    rgb_colors : np.ndarray
+        Array of shape ``(len(wl), 3)``, scaled so the brightest value is 1
     """
-    num_wl = len(wl)
-    rgb_colors = np.empty ((num_wl, 3))
-    for i in range (0, num_wl):
-        wl_nm = wl[i]
-        xyz = ciexyz.xyz_from_wavelength (wl_nm)
-        rgb_colors [i] = colormodels.rgb_from_xyz (xyz)
+    wl = np.asarray(wl, dtype=float)
+    if lut:
+        rgb_colors = rgb_lut(wl)
+    else:
+        rgb_colors = _rgb_from_wavelength_exact(wl)
     # scale to make brightest rgb value = 1.0
     rgb_max = np.max (rgb_colors)
     scaling = 1.0 / rgb_max
@@ -91,6 +137,7 @@ def plot_spectrum(wl, spectrum,
                   xtitle="Wavelength [nm]",
                   ytitle="Intensity",
                   title="",
+                  lod=False,
                   **kwargs):
     """
     Plots intensity [W/m*m/um] vs wavelength [nm] across the visible, shading the
@@ -109,6 +156,10 @@ def plot_spectrum(wl, spectrum,
         Minimum wavelength plotted [nm]
     wlmax : float
         Maximum wavelength plotted [nm]
+    stellar_spec : str
+        Name of a built-in star (see `jakely.ispectrum.stellar.list_stars`)
+        to multiply the spectrum by, treating it as an albedo. The stellar
+        flux is scaled to a mean of 1 across the plotted wavelengths
     show_cie : bool
         Adds overplotted CIE eye sensitivity curves for reference
     xtitle : str
@@ -117,6 +168,11 @@ def plot_spectrum(wl, spectrum,
         y-axis label
     title : str
         Plot title
+    lod : bool or int
+        Level of detail: reduce the spectrum (curve and colored fill) with a
+        min/max-preserving M4 decimation to the width of the axes in pixels
+        (``True``) or to the given number of columns. The perceived color
+        still uses the full spectrum
 
     Returns
     -------
@@ -136,19 +192,20 @@ def plot_spectrum(wl, spectrum,
     wl = wl[ifin]
     spectrum = spectrum[ifin]
 
-    # Read-in solar spectrum
+    # Weight by a built-in stellar spectrum
     if stellar_spec is None:
         pass
-    elif stellar_spec == "Sun":
-        data = np.genfromtxt("spectra/earth_quadrature_radiance_refl.dat", skip_header=8)
-        wl_solar = data[:,0] * 1000.0 # Convert microns to nm
-        F_solar = data[:,2]
-        # Interpolate sun to CMF
-        F_solar = np.interp(wl, wl_solar, F_solar)
-        # Multiply Albedo and Flux
-        spectrum = spectrum * F_solar
+    elif stellar.ALIASES.get(stellar_spec, stellar_spec) in stellar.STARS:
+        # Multiply Albedo and Flux scaled to a mean of 1 (resampled once per
+        # star and grid), since the absolute flux of distant stars is too
+        # faint to give a color
+        spectrum = stellar.weight_spectrum(wl, spectrum, stellar_spec, normalize=True)
+        # Drop wavelengths not covered by the star
+        ifin = np.isfinite(spectrum)
+        wl = wl[ifin]
+        spectrum = spectrum[ifin]
     else:
-        print("Given stellar_spec is not included.")
+        print("Given stellar_spec is not included. Use one of %s" %stellar.list_stars())
 
     # Convert Flux to photon counts
     umnm = 1e-3
@@ -161,26 +218,37 @@ def plot_spectrum(wl, spectrum,
     ax1 = plt.subplot(gs[0])
     ax1.set_xlim([wlmin, wlmax])
 
+    #
+    rgb_eye = cie.irgb_string_from_xyz (cie.xyz_from_spectrum (wl, spectrum))
+
+    # Reduce to the pixel resolution of the axes
+    if lod:
+        if lod is True:
+            lod = int(np.ceil(ax1.get_window_extent().width))
+        idx = m4_indices(wl, spectrum, lod)
+        wl = wl[idx]
+        spectrum = spectrum[idx]
+
     num_wl = len(wl)
 
     #
     rgb_colors = rgb_from_wavelength(wl)
 
-    #
-    spec = np.vstack([wl, spectrum]).T
-    rgb_eye = colormodels.irgb_string_from_rgb (
-        colormodels.rgb_from_xyz (ciexyz.xyz_from_spectrum (spec)))
-
-    # draw color patches (thin vertical lines matching the spectrum curve) in color
-    for i in range (0, num_wl-1):    # skipping the last one here to stay in range
-        x0 = wl [i]
-        x1 = wl [i+1]
-        y0 = spectrum [i]
-        y1 = spectrum [i+1]
-        poly_x = [x0,  x1,  x1, x0]
-        poly_y = [0.0, 0.0, y1, y0]
-        color_string = colormodels.irgb_string_from_rgb (rgb_colors[i])
-        ax1.fill (poly_x, poly_y, color_string, edgecolor=color_string)
+    # draw color patches (thin vertical lines matching the spectrum curve) in
+    # color, as a single collection of quadrilaterals between neighbouring points
+    verts = np.empty((num_wl-1, 4, 2))
+    verts[:,0,0] = wl[:-1]
+    verts[:,1,0] = wl[1:]
+    verts[:,2,0] = wl[1:]
+    verts[:,3,0] = wl[:-1]
+    verts[:,0,1] = 0.0
+    verts[:,1,1] = 0.0
+    verts[:,2,1] = spectrum[1:]
+    verts[:,3,1] = spectrum[:-1]
+    patch_colors = cie.irgb_from_rgb (rgb_colors[:-1]) / 255.0
+    patches = PolyCollection(verts, facecolors=patch_colors,
+                             edgecolors=patch_colors)
+    ax1.add_collection(patches, autolim=True)
 
     # plot intensity as a curve
     ax1.plot (
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Flux-conserving resampling of spectra between wavelength grids.
+
+@author: jlustigy
+"""
+
+import numpy as np
+from scipy import sparse
+
+from .._lru_cache import LRUCache, array_digest
+
+__all__ = ["SpectralResampler", "get_resampler", "bin_edges"]
+
+# Maximum number of (src, dst) grid pairs kept by get_resampler
+CACHE_SIZE = 32
+
+_resampler_cache = LRUCache(CACHE_SIZE)
+
+def bin_edges(wl):
+    """
+    Bin edges of a grid of bin centers: midpoints between neighbouring
+    centers, with the outer bins as wide as their neighbours.
+
+    Parameters
+    ----------
+    wl : array
+        Increasing wavelength grid (bin centers)
+
+    Returns
+    -------
+    edges : np.ndarray
+        Array of length ``len(wl) + 1``
+    """
+    wl = np.asarray(wl, dtype=float)
+    if len(wl) == 1:
+        return np.array([wl[0] - 0.5, wl[0] + 0.5])
+    mid = 0.5 * (wl[1:] + wl[:-1])
+    return np.concatenate([[wl[0] - (mid[0] - wl[0])], mid,
+                           [wl[-1] + (wl[-1] - mid[-1])]])
+
+class SpectralResampler(object):
+    """
+    Resample spectra from one wavelength grid onto another.
+
+    Each target bin takes the overlap-weighted mean of the source bins it
+    covers, treating the source as constant across each of its bins, so the
+    integrated flux is conserved. The weights are computed once, as a sparse
+    ``(len(dst_wl), len(src_wl))`` matrix, and applied to any number of
+    spectra with a sparse matrix product.
+
+    Parameters
+    ----------
+    src_wl : array
+        Wavelength grid of the input spectra (bin centers)
+    dst_wl : array
+        Wavelength grid to resample onto (bin centers)
+    fill : float (optional)
+        Value of target bins with no overlap with the source grid
+
+    Example
+    -------
+    >>> res = SpectralResampler(wl_mars, np.arange(360., 831.))
+    >>> albedo_1nm = res(albedo)
+    """
+
+    def __init__(self, src_wl, dst_wl, fill=np.nan):
+
+        src_wl = np.asarray(src_wl, dtype=float)
+        dst_wl = np.asarray(dst_wl, dtype=float)
+
+        # Source columns are sorted internally, target rows are not
+        self.src_order = np.argsort(src_wl, kind="stable")
+        dst_order = np.argsort(dst_wl, kind="stable")
+        self.src_wl = src_wl
+        self.dst_wl = dst_wl
+        self.fill = fill
+
+        src_edges = bin_edges(src_wl[self.src_order])
+        dst_edges = bin_edges(dst_wl[dst_order])
+
+        # Split the wavelength axis at every edge of both grids; each piece
+        # lies in at most one source and one target bin
+        cuts = np.union1d(src_edges, dst_edges)
+        lo, hi = cuts[:-1], cuts[1:]
+        center = 0.5 * (lo + hi)
+        isrc = np.searchsorted(src_edges, center) - 1
+        idst = np.searchsorted(dst_edges, center) - 1
+        good = ((isrc >= 0) & (isrc < len(src_wl)) &
+                (idst >= 0) & (idst < len(dst_wl)))
+        width = (hi - lo)[good]
+        rows = dst_order[idst[good]]
+        cols = isrc[good]
+
+        # Normalize by the covered width of each target bin
+        covered = np.bincount(rows, weights=width, minlength=len(dst_wl))
+        self.empty = covered == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weights = width / covered[rows]
+
+        self.weights = sparse.csr_matrix((weights, (rows, cols)),
+                                         shape=(len(dst_wl), len(src_wl)))
+
+    def __call__(self, spectra):
+        """
+        Resample one or many spectra.
+
+        Parameters
+        ----------
+        spectra : array
+            Spectrum of shape ``(len(src_wl),)`` or spectra of shape
+            ``(n_spectra, len(src_wl))`` on the source grid. NaNs only affect
+            the target bins they overlap
+
+        Returns
+        -------
+        resampled : np.ndarray
+            Spectra on the target grid, shape ``(len(dst_wl),)`` or
+            ``(n_spectra, len(dst_wl))``
+        """
+        spectra = np.asarray(spectra, dtype=float)
+        if spectra.shape[-1] != len(self.src_wl):
+            raise ValueError("spectra must have %i wavelengths, got %i"
+                             %(len(self.src_wl), spectra.shape[-1]))
+        # Columns in the sorted source order used by the weights
+        spectra = spectra[..., self.src_order]
+        out = np.asarray(self.weights.dot(spectra.T).T)
+        out[..., self.empty] = self.fill
+        return out
+
+def get_resampler(src_wl, dst_wl, fill=np.nan):
+    """
+    Get a cached `SpectralResampler` between two grids, so repeated
+    conversions on the same grids skip computing the weights.
+
+    Parameters
+    ----------
+    src_wl : array
+        Wavelength grid of the input spectra
+    dst_wl : array
+        Wavelength grid to resample onto
+    fill : float (optional)
+        Value of target bins with no overlap with the source grid
+
+    Returns
+    -------
+    resampler : SpectralResampler
+    """
+    key = (array_digest(src_wl), array_digest(dst_wl), fill if fill == fill else "nan")
+    return _resampler_cache.get(key, lambda: SpectralResampler(src_wl, dst_wl, fill=fill))
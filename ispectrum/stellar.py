@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Built-in stellar spectra for weighting albedo spectra in `plot_spectrum`.
+
+Stars are read once through the `spectral_library` cache and resampled
+once per target wavelength grid, so looping over many albedo spectra under
+the same star costs no extra I/O or resampling.
+
+@author: jlustigy
+"""
+
+import numpy as np
+
+from ..colorvision.spectral_library import load_spectrum
+from .._lru_cache import LRUCache, array_digest
+from .resample import get_resampler
+
+__all__ = ["STARS", "list_stars", "load_star", "stellar_flux",
+           "weight_spectrum"]
+
+# name : (file, wavelength to nm, flux to W/m^2/um)
+STARS = {
+    "Sun" : ("sunum.txt", 1e3, 1e4),                # um, W/cm^2/um
+    "HD22049" : ("hd22049um.txt", 0.1, 10.0),       # A, erg/s/cm^2/A
+    "AD Leo" : ("adleo_dat.txt", 1e3, 1e4),         # um, W/cm^2/um
+}
+
+# Other names of the built-in stars
+ALIASES = {
+    "sun" : "Sun",
+    "eps Eri" : "HD22049",
+    "epsilon Eridani" : "HD22049",
+    "ADLeo" : "AD Leo",
+    "adleo" : "AD Leo",
+}
+
+# Maximum number of resampled fluxes kept
+CACHE_SIZE = 64
+
+_stars = {}
+_flux_cache = LRUCache(CACHE_SIZE)
+
+def _star_name(name):
+    name = ALIASES.get(name, name)
+    if name not in STARS:
+        raise ValueError("Unknown star '%s'. Use one of %s" %(name, list_stars()))
+    return name
+
+def list_stars():
+    """
+    Names of the built-in stars.
+
+    Returns
+    -------
+    names : list
+    """
+    return sorted(STARS)
+
+def load_star(name):
+    """
+    Spectrum of a built-in star, loaded once.
+
+    Parameters
+    ----------
+    name : str
+        One of `list_stars()` (or an alias such as ``"eps Eri"``)
+
+    Returns
+    -------
+    wl : np.ndarray
+        Wavelength grid [nm], read-only
+    flux : np.ndarray
+        Flux [W/m^2/um], read-only
+    """
+    name = _star_name(name)
+    if name not in _stars:
+        fn, wl_scale, flux_scale = STARS[name]
+        data = load_spectrum(fn)
+        wl = data[:,0] * wl_scale
+        flux = data[:,1] * flux_scale
+        wl.setflags(write=False)
+        flux.setflags(write=False)
+        _stars[name] = (wl, flux)
+    return _stars[name]
+
+def stellar_flux(name, wl, normalize=False):
+    """
+    Flux of a built-in star resampled onto a wavelength grid (cached per
+    star and grid).
+
+    Parameters
+    ----------
+    name : str
+        One of `list_stars()`
+    wl : array
+        Target wavelength grid [nm]
+    normalize : bool (optional)
+        Scale the flux to a mean of 1 across the grid, so weighted albedos
+        keep their magnitude. By default the absolute flux is returned
+
+    Returns
+    -------
+    flux : np.ndarray
+        Read-only flux on ``wl``, NaN outside of the stellar spectrum
+    """
+    name = _star_name(name)
+
+    def make():
+        wl_star, flux_star = load_star(name)
+        flux = get_resampler(wl_star, wl)(flux_star)
+        if normalize:
+            flux = flux / np.nanmean(flux)
+        flux.setflags(write=False)
+        return flux
+
+    return _flux_cache.get((name, array_digest(wl), normalize), make)
+
+def weight_spectrum(wl, albedo, star, normalize=False):
+    """
+    Multiply an albedo spectrum by the flux of a built-in star.
+
+    Only the resampled flux is cached (per star and grid); the product with
+    the albedo is computed on every call.
+
+    Parameters
+    ----------
+    wl : array
+        Wavelength grid [nm]
+    albedo : array
+        Albedo on ``wl``
+    star : str
+        One of `list_stars()`
+    normalize : bool (optional)
+        Use the stellar flux scaled to a mean of 1 (see `stellar_flux`)
+        instead of the absolute flux [W/m^2/um]. This changes the colors
+
+    Returns
+    -------
+    spectrum : np.ndarray
+        Albedo x flux
+    """
+    return np.asarray(albedo, dtype=float) * stellar_flux(star, wl, normalize=normalize)
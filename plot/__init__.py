@@ -6,7 +6,8 @@ Created on Fri Mar  4 13:36:30 2016
 """
 
 from .hexbin_dots import plot_hexbin_dots as hexbin_dots
-from .color_corner import PCA_corner
+from .color_corner import PCA_corner, PCA_corner_stream
 from .set_figure_colors import set_backgroundcolor, set_foregroundcolor, set_figure_colors, determine_contrasting_color
 from .colortable import *
+from .colortable_svg import *
 from .custom_color_maps import *
@@ -1,10 +1,97 @@
 import numpy as np
 import matplotlib.pyplot as plt
+import matplotlib.colors as colors
 from matplotlib import gridspec
 
 from jakely import colorize
+from ..toolbox.streaming_pca import StreamingPCA, iter_rows
 
-def PCA_corner(x, y, lowdim, color=None, N=None, size=5, xlabel="", ylabel="", hcolor="black"):
+__all__ = ["PCA_corner", "PCA_corner_stream", "CornerHistograms"]
+
+class CornerHistograms(object):
+    """
+    Accumulated 1D histograms of each column and 2D histograms of each pair
+    of columns of a sample, on fixed limits. Samples can be added in chunks.
+
+    Parameters
+    ----------
+    lo : array
+        Lower limit of each column
+    hi : array
+        Upper limit of each column
+    bins : int
+        Number of bins along each column
+
+    Example
+    -------
+    >>> hists = CornerHistograms.from_array(lowdim[:,:N], bins=64)
+    """
+
+    def __init__(self, lo, hi, bins=64):
+        lo = np.array(lo, dtype=float)
+        hi = np.array(hi, dtype=float)
+        # Avoid zero-width ranges
+        same = ~(hi > lo)
+        lo[same] -= 0.5
+        hi[same] += 0.5
+        self.lo = lo
+        self.hi = hi
+        self.N = len(lo)
+        self.bins = bins
+        self.hist1d = np.zeros((self.N, bins))
+        self.hist2d = np.zeros((self.N, self.N, bins, bins))
+
+    @classmethod
+    def from_array(cls, data, bins=64):
+        """Histograms of all of ``data`` (M samples x N columns), limits
+        computed in one vectorized pass"""
+        data = np.asarray(data, dtype=float)
+        hists = cls(np.nanmin(data, axis=0), np.nanmax(data, axis=0), bins=bins)
+        hists.update(data)
+        return hists
+
+    def edges(self, i):
+        """Bin edges of column i"""
+        return np.linspace(self.lo[i], self.hi[i], self.bins + 1)
+
+    def update(self, data):
+        """
+        Add samples.
+
+        Parameters
+        ----------
+        data : array
+            Array of shape (m, >=N). Samples outside of the limits or with
+            non-finite values are skipped in the histograms they fall in
+        """
+        data = np.asarray(data, dtype=float)[:, :self.N]
+        # Bin index of every value, all columns at once
+        pos = (data - self.lo) / (self.hi - self.lo) * self.bins
+        good = np.isfinite(pos) & (pos >= 0) & (pos <= self.bins)
+        idx = np.clip(np.where(good, pos, 0).astype(np.intp), 0, self.bins - 1)
+
+        for i in range(self.N):
+            self.hist1d[i] += np.bincount(idx[good[:,i], i], minlength=self.bins)
+            for j in range(i):
+                both = good[:,i] & good[:,j]
+                flat = idx[both, i] * self.bins + idx[both, j]
+                self.hist2d[i, j] += np.bincount(flat, minlength=self.bins**2).reshape(self.bins, self.bins)
+
+    def merge(self, other):
+        """Add the counts of histograms with the same limits"""
+        self.hist1d += other.hist1d
+        self.hist2d += other.hist2d
+
+    def density(self, i):
+        """Normalized 1D histogram of column i"""
+        width = (self.hi[i] - self.lo[i]) / self.bins
+        total = self.hist1d[i].sum()
+        if total == 0:
+            return self.hist1d[i]
+        return self.hist1d[i] / (total * width)
+
+def PCA_corner(x, y, lowdim, color=None, N=None, size=5, xlabel="", ylabel="", hcolor="black",
+               fast=None, threshold=20000, bins=64, hist_cmap="Greys"):
     """Plot all the extracted PCA dimensionality reduced projections against one
     another, as well as a scatter plot with user specified physical axes. The color
     of each point is consistent across all subplots.
@@ -31,6 +118,17 @@ def PCA_corner(x, y, lowdim, color=None, N=None, size=5, xlabel="", ylabel="", h
         Label for y-axis on 'physical' plot
     hcolor : str
         Color of line of histograms
+    fast : bool (optional)
+        Build the grid once with shared axes and draw rasterized 2D histograms
+        instead of scatter plots in the PC panels. Defaults to True for more
+        than ``threshold`` samples
+    threshold : int (optional)
+        Sample size above which ``fast`` is used and scatter points are
+        rasterized
+    bins : int (optional)
+        Number of histogram bins per PC in fast mode
+    hist_cmap : str (optional)
+        Colormap of the 2D histograms in fast mode
 
     Returns
     -------
@@ -46,6 +144,16 @@ def PCA_corner(x, y, lowdim, color=None, N=None, size=5, xlabel="", ylabel="", h
     else:
         pass
 
+    if fast is None:
+        fast = len(lowdim) > threshold
+
+    if fast:
+        hists = CornerHistograms.from_array(lowdim[:,:N], bins=bins)
+        return _PCA_corner_fast(x, y, hists, color=color, size=size,
+                                xlabel=xlabel, ylabel=ylabel, hcolor=hcolor,
+                                hist_cmap=hist_cmap,
+                                rasterized=len(x) > threshold)
+
     PCs = np.copy(lowdim)
 
     if color is None:
@@ -106,7 +214,7 @@ def PCA_corner(x, y, lowdim, color=None, N=None, size=5, xlabel="", ylabel="", h
             if matrix[i,j]:
                 # Diagonal: Histograms
                 ax = plt.subplot(gs[i,j])
-                ax.hist(PCs[:,j], normed=True, histtype='step', color=hcolor, lw=1.0)
+                ax.hist(PCs[:,j], density=True, histtype='step', color=hcolor, lw=1.0)
                 ax.set_xlim(PC_plot_lims[j])
                 plt.setp(ax.get_xticklabels(), fontsize=14, rotation=45)
                 plt.setp(ax.get_yticklabels(), fontsize=14, rotation=45)
@@ -143,3 +251,143 @@ def PCA_corner(x, y, lowdim, color=None, N=None, size=5, xlabel="", ylabel="", h
                 # Right of diagonal: Do nothing.
                 pass
     return fig
+
+def PCA_corner_stream(data, N=3, x=None, y=None, color=None, chunksize=100000,
+                      bins=64, return_pca=False, **kwargs):
+    """Fit a PCA to raw features streamed in chunks and make the fast
+    `PCA_corner` plot of the projections, without holding the data or the
+    projections in memory.
+
+    The data are read three times: to fit the PCA (`StreamingPCA`), to find
+    the limits of each PC, and to accumulate the `CornerHistograms`.
+
+    Parameters
+    ----------
+    data : array or callable
+        Raw features with shape MxD, e.g. a `numpy.memmap`, or a function
+        returning a fresh iterator over chunks of rows on every call. A
+        generator can only be read once and is not accepted
+    N : int (optional)
+        Number of PCs to fit and plot
+    x : array (optional)
+        X-values for 'physical' plot, omitted if None
+    y : array (optional)
+        Y-values for 'physical' plot (same length as x)
+    color : array (optional)
+        Color values for each sample of the 'physical' plot
+    chunksize : int (optional)
+        Number of rows per chunk when data is an array
+    bins : int (optional)
+        Number of histogram bins per PC
+    return_pca : bool (optional)
+        Also return the fitted `StreamingPCA`
+    **kwargs
+        size, xlabel, ylabel, hcolor and hist_cmap as in `PCA_corner`
+
+    Returns
+    -------
+    fig : matplotlib.figure.Figure
+        Figure which can be saved, etc
+    pca : StreamingPCA
+        Fitted PCA, if return_pca
+    """
+
+    if callable(data):
+        chunks = data
+    elif iter(data) is data:
+        raise ValueError("data is an iterator, which can only be read once. "
+                         "Pass a function returning a fresh iterator over the "
+                         "chunks on every call instead")
+    else:
+        chunks = lambda: iter_rows(data, chunksize=chunksize)
+
+    # Pass 1: fit
+    pca = StreamingPCA(n_components=N).fit(chunks())
+
+    # Pass 2: limits of the projections
+    lo = np.full(N, np.inf)
+    hi = np.full(N, -np.inf)
+    for chunk in chunks():
+        proj = pca.transform(chunk)
+        lo = np.fmin(lo, np.nanmin(proj, axis=0))
+        hi = np.fmax(hi, np.nanmax(proj, axis=0))
+
+    # Pass 3: histograms
+    hists = CornerHistograms(lo, hi, bins=bins)
+    for chunk in chunks():
+        hists.update(pca.transform(chunk))
+
+    fig = _PCA_corner_fast(x, y, hists, color=color,
+                           rasterized=True, **kwargs)
+
+    if return_pca:
+        return fig, pca
+    return fig
+
+def _PCA_corner_fast(x, y, hists, color=None, size=5, xlabel="", ylabel="",
+                     hcolor="black", hist_cmap="Greys", rasterized=True):
+    """
+    `PCA_corner` from precomputed `CornerHistograms`: one shared-axes grid,
+    2D histograms below the diagonal and 1D histograms on the diagonal.
+    """
+    N = hists.N
+
+    # Set Params
+    PC_labels = ['PC'+str(i+1) for i in range(N)]
+    figlen = (N+1)*2
+    subN = int(np.floor(N/2.0))
+    val2 = np.mod(N,2)
+
+    # Create figure
+    fig = plt.figure(figsize=(figlen,figlen))
+    gs = gridspec.GridSpec(N,N)
+
+    # Lower triangle and diagonal, x shared down columns, y along rows
+    axes = np.empty((N,N), dtype=object)
+    for i in range(N):
+        for j in range(i+1):
+            sharex = axes[j,j] if i > j else None
+            sharey = axes[i,0] if (i > j) and (j > 0) else None
+            ax = fig.add_subplot(gs[i,j], sharex=sharex, sharey=sharey)
+            axes[i,j] = ax
+            ax.tick_params(labelsize=14, labelrotation=45)
+            ax.tick_params(labelbottom=(i == N-1), labelleft=(j == 0) and (i > 0))
+            if i == N-1:
+                ax.set_xlabel(PC_labels[j])
+            if (j == 0) and (i > 0):
+                ax.set_ylabel(PC_labels[i])
+
+            if i == j:
+                # Diagonal: Histograms
+                ax.stairs(hists.density(j), hists.edges(j), color=hcolor, lw=1.0)
+                ax.set_xlim(hists.lo[j], hists.hi[j])
+                ax.set_yticklabels([])
+            else:
+                # Left of diagonal: 2D histograms
+                H = np.ma.masked_equal(hists.hist2d[i,j], 0)
+                norm = colors.LogNorm(vmin=1, vmax=max(H.max(), 1)) if H.count() > 0 else None
+                ax.pcolormesh(hists.edges(j), hists.edges(i), H, cmap=hist_cmap,
+                              norm=norm, rasterized=True)
+                ax.set_ylim(hists.lo[i], hists.hi[i])
+
+    # Physical plot in upper right
+    if x is not None:
+        if color is None:
+            print("Error: No colors provided. Setting colors to y")
+            c,scalarMap,cNorm = colorize(y, cmap="viridis")
+        else:
+            c = color
+        ax0 = fig.add_subplot(gs[:subN,subN+val2:])
+        ax0.tick_params(labelsize=14, labelrotation=45)
+        ax0.scatter(x, y, c=c, s=size, lw=0, rasterized=rasterized)
+        ax0.set_xlabel(xlabel)
+        if val2 == 0:
+            ax0.xaxis.set_label_position('top')
+            ax0.yaxis.set_label_position('right')
+            ax0.xaxis.set_ticks_position('top')
+            ax0.yaxis.set_ticks_position('right')
+            ax0.set_ylabel(ylabel, rotation=270, labelpad=25)
+        else:
+            ax0.set_ylabel(ylabel)
+
+    return fig
@@ -1,17 +1,89 @@
-import os
-import sys
 import numpy as np
-import scipy as sp
-import scipy.optimize
 import matplotlib as mpl
 import matplotlib.colors as colors
 import matplotlib.pyplot as plt
 from matplotlib import gridspec, rc, ticker
+import matplotlib.font_manager
+import matplotlib.transforms as mtransforms
+from matplotlib.collections import PathCollection
+from matplotlib.path import Path
+from matplotlib.textpath import TextPath
 
-sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from colorize import colorize
+from ..colorize import colorize
+from ..toolbox.column_format import format_column
+from .set_figure_colors import contrasting_colors
 
-__all__ = ["ColorTable", "test_colortable", "ColorTableLinks"]
+__all__ = ["ColorTable", "test_colortable", "ColorTableLinks", "colortable_cells"]
+
+def colortable_cells(data, smap, cnorm, fmt = "%.1f", cmin = None,
+                     cmax = None, nancolor = (0.0, 0.0, 0.0), nantext = "",
+                     data_pm = None):
+    '''
+    Compute the box colors, text colors and text labels of every cell in a
+    color table at once.
+
+    Parameters
+    ----------
+    data : `numpy.array`
+        Table values
+    smap : `matplotlib.cm.ScalarMappable`
+        Mappable holding the colormap (e.g. from `colorize`)
+    cnorm : `matplotlib.colors.Normalize`
+        Color normalization
+    fmt : str
+        Format of the cell text
+    cmin, cmax : float
+        Values below/above these (including -inf/inf) are labeled
+        ``<cmin``/``>cmax``
+    nancolor : tuple
+        Box color of NaN cells
+    nantext : str or None
+        Text of NaN cells and of inf cells not labeled with cmin/cmax. If
+        None, they are printed with ``"%.2f"`` (e.g. ``nan``, ``inf``)
+    data_pm : list or tuple
+        Optional ``[data_plus, data_minus]`` to add as super/subscripts
+
+    Returns
+    -------
+    boxcolors : `numpy.array`
+        RGBA colors with shape ``data.shape + (4,)``
+    textcolors : `numpy.array`
+        Black or white text color of each cell
+    texts : `numpy.array`
+        Text label of each cell
+    '''
+
+    data = np.asarray(data, dtype=float)
+
+    # Set boxcolor by colormap
+    boxcolors = smap.cmap(cnorm(data))
+    boxcolors[np.isnan(data)] = colors.to_rgba(nancolor)
+
+    # Set text color based on brightness
+    textcolors = contrasting_colors(boxcolors)
+
+    # Baseline text, with percentile text if provided
+    finite = np.isfinite(data)
+    texts = format_column(data, fmt, errors = data_pm, skip_nan_errors = False)
+
+    # Determine if greater/less than signs are needed (also for +-inf)
+    bad = ~finite
+    if cmax is not None:
+        above = data > cmax
+        texts[above] = r"$>$"+fmt %cmax
+        bad &= ~above
+    if cmin is not None:
+        below = data < cmin
+        texts[below] = r"$<$"+fmt %cmin
+        bad &= ~below
+
+    # Catch nans and remaining infs
+    if nantext is None:
+        texts[bad] = np.char.mod("%.2f", data[bad])
+    else:
+        texts[bad] = nantext
+
+    return boxcolors, textcolors, texts.astype(str)
 
 def ColorTable(xlabels, ylabels, data, savename = None,
                labelfontsize = 18, labelrotation = 45, textsize = 18,
@@ -20,7 +92,7 @@ def ColorTable(xlabels, ylabels, data, savename = None,
                cmax = None, xlabel = None, ylabel = None,
                xlabel_spacing = 0.00, ylabel_spacing = 0.00,
                nancolor = (0.0, 0.0, 0.0), nantext = "", titlefontsize = 20,
-               data_pm = None):
+               data_pm = None, backend = "subplots"):
     '''
     Creates a `matplotlib.pyplot` version of a simple 2D
     table, where the values in each cell are color coded
@@ -35,11 +107,30 @@ def ColorTable(xlabels, ylabels, data, savename = None,
         List or tuple of two `numpy.array`  e.g. ``[data_plus, data_minus]``, one
         array to display as the upper percentile and one array for the lower
         percentile.
+    backend : str
+        ``"subplots"`` draws every cell on its own Axes and returns the 2D
+        array of Axes. ``"image"`` draws the whole table as one image on a
+        single Axes (returned instead), which is much faster for large tables.
     '''
 
     assert len(xlabels) == data.shape[0]
     assert len(ylabels) == data.shape[1]
 
+    if backend == "image":
+        return _ColorTableImage(xlabels, ylabels, data, savename = savename,
+                                labelfontsize = labelfontsize,
+                                labelrotation = labelrotation,
+                                spacing = spacing, colormap = colormap,
+                                fmt = fmt, title = title, cmin = cmin,
+                                cmax = cmax, xlabel = xlabel, ylabel = ylabel,
+                                xlabel_spacing = xlabel_spacing,
+                                ylabel_spacing = ylabel_spacing,
+                                nancolor = nancolor, nantext = nantext,
+                                titlefontsize = titlefontsize, data_pm = data_pm)
+    elif backend != "subplots":
+        print("Error: unrecognized backend. Please use 'subplots' or 'image'.")
+        return
+
     # Dimensions
     Nx = len(xlabels)
     Ny = len(ylabels)
@@ -51,6 +142,13 @@ def ColorTable(xlabels, ylabels, data, savename = None,
     vcolors, smap, cnorm = colorize(datav, cmap=colormap, vmin = cmin,
                                     vmax = cmax)
 
+    # Colors and labels of all cells
+    boxcolors, textcolors, texts = colortable_cells(data, smap, cnorm, fmt = fmt,
+                                                    cmin = cmin, cmax = cmax,
+                                                    nancolor = nancolor,
+                                                    nantext = nantext,
+                                                    data_pm = data_pm)
+
     # Create figure
     fig, ax = plt.subplots(Ny, Nx, figsize = (Nx,Ny))
 
@@ -69,52 +167,11 @@ def ColorTable(xlabels, ylabels, data, savename = None,
             ax[iy, ix].set_xticks([])
             ax[iy, ix].set_yticks([])
 
-            # Set boxcolor by colormap
-            boxcolor = smap.cmap(cnorm(data[ix, iy]))
-
-            if np.isnan(data[ix, iy]):
-                boxcolor = nancolor
-
             # Set the facecolor to boxcolor
-            ax[iy, ix].set_facecolor(boxcolor)
-
-            # Get RGB
-            R = boxcolor[0] * 255
-            G = boxcolor[1] * 255
-            B = boxcolor[2] * 255
-
-            # Calculate grey "brightness"
-            grey = (R*0.299 + G*0.587 + B*0.114)
-
-            # Set text color based on brightness
-            if grey > 186:
-                textcolor = "#000000"
-            else:
-                textcolor = "#ffffff"
-
-            # Catch nans and infs
-            if np.isfinite(data[ix, iy]):
-
-                # Baseline text
-                text = fmt %data[ix, iy]
-
-                # Add percentile text if proided
-                if data_pm is not None:
-                    text += "$^{+%s}_{-%s}$" %(fmt %data_pm[0][ix,iy], fmt %data_pm[1][ix,iy])
-
-                # Determine if greater/less than signs are needed
-                if cmax is not None:
-                    if data[ix, iy] > cmax:
-                        text = r"$>$"+fmt %cmax
-                if cmin is not None:
-                    if data[ix, iy] < cmin:
-                        text = r"$<$"+fmt %cmin
-
-            else:
-
-                # This is not a number. Use nantext
-                text = nantext
+            ax[iy, ix].set_facecolor(boxcolors[ix, iy])
 
+            text = texts[ix, iy]
+            textcolor = textcolors[ix, iy]
 
             # Add text to plot
             ax[iy, ix].text(0.5, 0.5, text, ha="center", va="center",
@@ -159,6 +216,130 @@ def ColorTable(xlabels, ylabels, data, savename = None,
 
     return fig, ax
 
+def _ColorTableImage(xlabels, ylabels, data, savename = None,
+                     labelfontsize = 18, labelrotation = 45,
+                     spacing = 0.025, colormap = "Blues",
+                     fmt = "%.1f", title = None, cmin = None,
+                     cmax = None, xlabel = None, ylabel = None,
+                     xlabel_spacing = 0.00, ylabel_spacing = 0.00,
+                     nancolor = (0.0, 0.0, 0.0), nantext = "", titlefontsize = 20,
+                     data_pm = None):
+    '''
+    Single-Axes backend for `ColorTable`. The cells are drawn as one
+    `pcolormesh`, the cell text as one collection, and the tick labels are
+    set once for each axis.
+    '''
+
+    # Dimensions
+    Nx = len(xlabels)
+    Ny = len(ylabels)
+
+    # Create vector from 2d data
+    datav = data.reshape([-1])
+
+    # Get colormap for data range
+    vcolors, smap, cnorm = colorize(datav, cmap=colormap, vmin = cmin,
+                                    vmax = cmax)
+
+    # Colors and labels of all cells
+    boxcolors, textcolors, texts = colortable_cells(data, smap, cnorm, fmt = fmt,
+                                                    cmin = cmin, cmax = cmax,
+                                                    nancolor = nancolor,
+                                                    nantext = nantext,
+                                                    data_pm = data_pm)
+
+    # Create figure with one Axes where the subplot grid would have been
+    fig, ax = plt.subplots(1, 1, figsize = (Nx,Ny))
+
+    # Spacing between cells, in points, drawn as cell edges in the
+    # background color
+    width = fig.get_figwidth() * (fig.subplotpars.right - fig.subplotpars.left)
+    lw = 72.0 * spacing * width / (Nx + spacing * (Nx - 1))
+
+    # Draw the table as one mesh with rows running top to bottom
+    mesh = ax.pcolormesh(np.arange(Nx + 1), np.arange(Ny + 1),
+                         np.zeros((Ny, Nx)), shading = "flat",
+                         edgecolors = fig.get_facecolor(), linewidth = lw)
+    mesh.set_array(None)
+    mesh.set_facecolor(np.transpose(boxcolors, (1, 0, 2)).reshape(-1, 4))
+    ax.set_xlim(0, Nx)
+    ax.set_ylim(Ny, 0)
+
+    # Add all cell text to plot as one collection of glyph outlines
+    ix, iy = np.meshgrid(np.arange(Nx), np.arange(Ny), indexing = "ij")
+    show = texts.ravel() != ""
+    offsets = np.column_stack([ix.ravel()[show] + 0.5, iy.ravel()[show] + 0.5])
+    ax.add_collection(_text_collection(texts.ravel()[show], offsets,
+                                       textcolors.ravel()[show], fig, ax))
+
+    # Set tick labels once per axis
+    ax.set_xticks(np.arange(Nx) + 0.5)
+    ax.set_xticklabels(xlabels, rotation = labelrotation,
+                       fontsize = labelfontsize, ha = "right")
+    ax.set_yticks(np.arange(Ny) + 0.5)
+    ax.set_yticklabels(ylabels, rotation = labelrotation,
+                       fontsize = labelfontsize, ha = "right")
+
+    # Get rid of the axis frame
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+
+    # Set title, optional
+    if title is not None:
+        ax.set_title(title, fontsize = titlefontsize)
+
+    # Set ylabel
+    if ylabel is not None:
+        fig.text(ylabel_spacing, 0.5, ylabel, ha = "left", va = "center",
+            fontsize=mpl.rcParams['font.size'], zorder=10, rotation = 90,
+            bbox=dict(boxstyle="square", fc="none", ec="none"))
+
+    # Set xlabel
+    if xlabel is not None:
+        fig.text(0.5, xlabel_spacing, xlabel, ha = "center", va = "bottom",
+                fontsize=mpl.rcParams['font.size'], zorder=10,
+                bbox=dict(boxstyle="square", fc="none", ec="none"))
+
+    # Save figure, optional
+    if savename is not None:
+        fig.savefig(savename, bbox_inches = "tight")
+
+    return fig, ax
+
+def _text_collection(texts, offsets, textcolors, fig, ax,
+                     fontsize = None):
+    '''
+    Build a single `matplotlib.collections.PathCollection` drawing each
+    string in ``texts`` centered on the data coordinates in ``offsets``. The
+    glyph outline of every unique string is computed only once.
+    '''
+
+    if fontsize is None:
+        fontsize = mpl.rcParams['font.size']
+
+    prop = mpl.font_manager.FontProperties(size = fontsize)
+
+    # Centered outline for each unique string, in points
+    paths = {}
+    for text in set(texts):
+        tpath = TextPath((0, 0), text, prop = prop)
+        ext = tpath.get_extents()
+        center = 0.5 * (ext.min + ext.max)
+        paths[text] = Path(tpath.vertices - center, tpath.codes)
+
+    # Points -> pixels, so the text keeps its size when saved at any dpi
+    pt_trans = mtransforms.Affine2D().scale(1.0 / 72.0) + fig.dpi_scale_trans
+
+    # Convert each unique color once
+    rgba = dict((c, colors.to_rgba(c)) for c in set(textcolors))
+    facecolors = np.array([rgba[c] for c in textcolors]).reshape(-1, 4)
+
+    return PathCollection([paths[text] for text in texts], offsets = offsets,
+                          offset_transform = ax.transData,
+                          transform = pt_trans,
+                          facecolors = facecolors, edgecolors = "none",
+                          zorder = 3)
+
 def ColorTableLinks(xlabels, ylabels, data, links, savetag = None,
                     labelfontsize = 18, labelrotation = 45, textsize = 18,
                     spacing = 0.025, colormap = "Blues",
@@ -187,6 +368,12 @@ def ColorTableLinks(xlabels, ylabels, data, links, savetag = None,
     vcolors, smap, cnorm = colorize(datav, cmap=colormap, vmin = cmin,
                                     vmax = cmax)
 
+    # Colors and labels of all cells
+    boxcolors, textcolors, texts = colortable_cells(data, smap, cnorm, fmt = fmt,
+                                                    cmin = cmin, cmax = cmax,
+                                                    nancolor = nancolor,
+                                                    nantext = None)
+
     # Create figure
     fig, ax = plt.subplots(Ny ,Nx, figsize = (Nx,Ny))
 
@@ -205,44 +392,9 @@ def ColorTableLinks(xlabels, ylabels, data, links, savetag = None,
             ax[iy, ix].set_xticks([])
             ax[iy, ix].set_yticks([])
 
-            # Set boxcolor by colormap
-            boxcolor = smap.cmap(cnorm(data[ix, iy]))
-
-            if np.isnan(data[ix, iy]):
-                boxcolor = nancolor
-
-            # Set the facecolor to boxcolor
-            """
-            ax[iy, ix].set_facecolor(boxcolor)
-            """
-
-            # Get RGB
-            R = boxcolor[0] * 255
-            G = boxcolor[1] * 255
-            B = boxcolor[2] * 255
-
-            # Calculate grey "brightness"
-            grey = (R*0.299 + G*0.587 + B*0.114)
-
-            # Set text color based on brightness
-            if grey > 186:
-                textcolor = "#000000"
-            else:
-                textcolor = "#ffffff"
-
-            # Catch nans and infs
-            if np.isfinite(data[ix, iy]):
-                text = fmt %data[ix, iy]
-            else:
-                text = "%.2f" %data[ix, iy]
-
-            # Determine if greater/less than signs are needed
-            if cmax is not None:
-                if data[ix, iy] > cmax:
-                    text = r"$>$"+fmt %cmax
-            if cmin is not None:
-                if data[ix, iy] < cmin:
-                    text = r"$<$"+fmt %cmin
+            boxcolor = boxcolors[ix, iy]
+            textcolor = textcolors[ix, iy]
+            text = texts[ix, iy]
 
             # Add text to plot
             """
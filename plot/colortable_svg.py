@@ -0,0 +1,213 @@
+import numpy as np
+from xml.sax.saxutils import escape, quoteattr
+
+from .colortable import colortable_cells
+from ..colorize import colorize
+
+__all__ = ["ColorTableSVG", "ColorTableHTML"]
+
+def ColorTableSVG(xlabels, ylabels, data, links, fh, colormap = "Blues",
+                  fmt = "%.1f", title = None, cmin = None, cmax = None,
+                  nancolor = (0.0, 0.0, 0.0), nantext = None,
+                  cellsize = 60, textsize = 14, labelfontsize = 16,
+                  labelrotation = 45, spacing = 0.025):
+    '''
+    Write a linked color table straight to an SVG file, without matplotlib.
+    Each cell is one ``<rect>`` and one ``<text>`` wrapped in an ``<a href>``,
+    written one row at a time.
+
+    Parameters
+    ----------
+    xlabels : list or `numpy.array`
+    ylabels : list or `numpy.array`
+    data : `numpy.array`
+        Table values with shape ``(len(xlabels), len(ylabels))``
+    links : `numpy.array`
+        URL of each cell (same shape as data), or None for no link
+    fh : file or str
+        Open file handle (text mode) or file name to write to
+    cellsize : float
+        Width and height of each cell in pixels
+    textsize : float
+        Font size of the cell text in pixels
+    labelfontsize : float
+        Font size of the x and y labels in pixels
+    spacing : float
+        Gap between cells as a fraction of the cell size
+    '''
+
+    assert len(xlabels) == data.shape[0]
+    assert len(ylabels) == data.shape[1]
+    if links is not None:
+        assert data.shape == np.shape(links)
+
+    if not hasattr(fh, "write"):
+        with open(fh, "w") as f:
+            return ColorTableSVG(xlabels, ylabels, data, links, f,
+                                 colormap = colormap, fmt = fmt, title = title,
+                                 cmin = cmin, cmax = cmax, nancolor = nancolor,
+                                 nantext = nantext, cellsize = cellsize,
+                                 textsize = textsize,
+                                 labelfontsize = labelfontsize,
+                                 labelrotation = labelrotation,
+                                 spacing = spacing)
+
+    # Dimensions
+    Nx = len(xlabels)
+    Ny = len(ylabels)
+
+    fills, textcolors, texts = _cells(data, colormap, fmt, cmin, cmax,
+                                      nancolor, nantext)
+
+    # Margins for the labels, estimated from the longest label
+    charw = 0.6 * labelfontsize
+    left = 10 + charw * max([len(str(l)) for l in ylabels] + [0])
+    bottom = 10 + charw * max([len(str(l)) for l in xlabels] + [0])
+    top = 10 + (1.5 * labelfontsize if title is not None else 0)
+    width = left + Nx * cellsize + 10
+    height = top + Ny * cellsize + bottom
+    gap = spacing * cellsize
+    box = cellsize - gap
+
+    fh.write('<svg xmlns="http://www.w3.org/2000/svg" '
+             'xmlns:xlink="http://www.w3.org/1999/xlink" '
+             'width="%.0f" height="%.0f" viewBox="0 0 %.0f %.0f">\n'
+             %(width, height, width, height))
+    fh.write('<style>text{font-family:sans-serif}'
+             '.c{font-size:%gpx;text-anchor:middle;dominant-baseline:central}'
+             '.l{font-size:%gpx;text-anchor:end;dominant-baseline:central}</style>\n'
+             %(textsize, labelfontsize))
+
+    # Set title, optional
+    if title is not None:
+        fh.write('<text x="%.1f" y="%.1f" style="font-size:%gpx;text-anchor:middle">%s</text>\n'
+                 %(left + 0.5 * Nx * cellsize, top - 10, 1.2 * labelfontsize,
+                   escape(str(title))))
+
+    x0 = left + np.arange(Nx) * cellsize + 0.5 * gap
+    xc = x0 + 0.5 * box
+
+    # Write one row of cells at a time
+    for iy in range(Ny):
+        y0 = top + iy * cellsize + 0.5 * gap
+        yc = y0 + 0.5 * box
+        row = ['<text class="l" x="%.1f" y="%.1f">%s</text>'
+               %(left - 5, yc, escape(str(ylabels[iy])))]
+        for ix in range(Nx):
+            cell = ('<rect x="%.1f" y="%.1f" width="%.1f" height="%.1f" fill="%s"/>'
+                    '<text class="c" x="%.1f" y="%.1f" fill="%s">%s</text>'
+                    %(x0[ix], y0, box, box, fills[ix, iy], xc[ix], yc,
+                      textcolors[ix, iy], texts[ix, iy]))
+            link = None if links is None else links[ix, iy]
+            if link is not None:
+                cell = '<a xlink:href=%s href=%s>%s</a>' %(quoteattr(str(link)),
+                                                            quoteattr(str(link)),
+                                                            cell)
+            row.append(cell)
+        fh.write("\n".join(row) + "\n")
+
+    # Rotated x labels below the table
+    ybot = top + Ny * cellsize + 5
+    fh.write("\n".join(['<text class="l" transform="translate(%.1f,%.1f) rotate(%g)">%s</text>'
+                        %(xc[ix], ybot, -labelrotation, escape(str(xlabels[ix])))
+                        for ix in range(Nx)]) + "\n")
+
+    fh.write("</svg>\n")
+
+    return
+
+def ColorTableHTML(xlabels, ylabels, data, links, fh, colormap = "Blues",
+                   fmt = "%.1f", title = None, cmin = None, cmax = None,
+                   nancolor = (0.0, 0.0, 0.0), nantext = None,
+                   textsize = 14):
+    '''
+    Write a linked color table straight to a standalone HTML ``<table>``,
+    without matplotlib. Rows are written to the file one at a time.
+
+    Parameters
+    ----------
+    xlabels : list or `numpy.array`
+    ylabels : list or `numpy.array`
+    data : `numpy.array`
+        Table values with shape ``(len(xlabels), len(ylabels))``
+    links : `numpy.array`
+        URL of each cell (same shape as data), or None for no link
+    fh : file or str
+        Open file handle (text mode) or file name to write to
+    textsize : float
+        Font size of the cell text in pixels
+    '''
+
+    assert len(xlabels) == data.shape[0]
+    assert len(ylabels) == data.shape[1]
+    if links is not None:
+        assert data.shape == np.shape(links)
+
+    if not hasattr(fh, "write"):
+        with open(fh, "w") as f:
+            return ColorTableHTML(xlabels, ylabels, data, links, f,
+                                  colormap = colormap, fmt = fmt, title = title,
+                                  cmin = cmin, cmax = cmax, nancolor = nancolor,
+                                  nantext = nantext, textsize = textsize)
+
+    # Dimensions
+    Nx = len(xlabels)
+    Ny = len(ylabels)
+
+    fills, textcolors, texts = _cells(data, colormap, fmt, cmin, cmax,
+                                      nancolor, nantext)
+
+    # Stylesheet before the table, <table> may not contain <style>
+    fh.write('<style>.ct td{text-align:center;padding:0.5em}'
+             '.ct a{color:inherit;text-decoration:none}</style>\n')
+    fh.write('<table style="border-collapse:separate;border-spacing:2px;'
+             'font-family:sans-serif;font-size:%gpx">\n' %textsize)
+    if title is not None:
+        fh.write('<caption>%s</caption>\n' %escape(str(title)))
+
+    # Write one row of cells at a time
+    for iy in range(Ny):
+        row = ['<tr class="ct"><th>%s</th>' %escape(str(ylabels[iy]))]
+        for ix in range(Nx):
+            text = texts[ix, iy]
+            link = None if links is None else links[ix, iy]
+            if link is not None:
+                text = '<a href=%s>%s</a>' %(quoteattr(str(link)), text)
+            row.append('<td style="background:%s;color:%s">%s</td>'
+                       %(fills[ix, iy], textcolors[ix, iy], text))
+        fh.write("".join(row) + "</tr>\n")
+
+    fh.write('<tr><th></th>' + "".join(['<th>%s</th>' %escape(str(l))
+                                        for l in xlabels]) + "</tr>\n")
+    fh.write("</table>\n")
+
+    return
+
+def _cells(data, colormap, fmt, cmin, cmax, nancolor, nantext):
+    '''
+    `colortable_cells` output converted for the web: hex box colors and
+    XML-escaped plain-text labels.
+    '''
+
+    # Get colormap for data range
+    vcolors, smap, cnorm = colorize(data.reshape([-1]), cmap=colormap,
+                                    vmin = cmin, vmax = cmax)
+
+    boxcolors, textcolors, texts = colortable_cells(data, smap, cnorm, fmt = fmt,
+                                                    cmin = cmin, cmax = cmax,
+                                                    nancolor = nancolor,
+                                                    nantext = nantext)
+
+    # Hex colors for the whole table at once
+    irgb = np.round(255 * np.clip(boxcolors[..., :3], 0, 1)).astype(int)
+    rgb = (irgb[..., 0] << 16) | (irgb[..., 1] << 8) | irgb[..., 2]
+    fills = np.char.add("#", np.char.zfill(np.char.mod("%x", rgb), 6))
+
+    # Replace the mathtext clipping markers and escape for XML
+    texts = np.char.replace(texts, r"$>$", ">")
+    texts = np.char.replace(texts, r"$<$", "<")
+    texts = np.char.replace(texts, "&", "&amp;")
+    texts = np.char.replace(texts, "<", "&lt;")
+    texts = np.char.replace(texts, ">", "&gt;")
+
+    return fills, textcolors, texts
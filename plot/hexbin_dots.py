@@ -5,64 +5,324 @@ Created on Fri Mar  4 13:31:55 2016
 @author: jlustigy
 """
 
+import warnings
+
 import numpy as np
 from jakely import colorize
+from .hexbin_reducers import get_reducer, grouped_quantile
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 from matplotlib import gridspec
 
-def add_hexbin_points(ax,h,Nx,Ny,cval,ms=2., cmap='Greys'):
-
-    padfrac = 4.0
-    counts = h.get_array()
-    verts = h.get_offsets()
-
-    colors,scalarMap,cNorm = colorize(cval,cmap=cmap)
-    N = len(cval)
-
-    # Calculate distance between all verticies
-    Nv = len(verts)
-    x,y = verts[:,0],verts[:,1]
-    dist = np.zeros([Nv,Nv])
-    for i in range(Nv):
-        for j in range(Nv):
-            if i!=j:
-                dist[i,j] = np.sqrt((x[i] - x[j])**2. + (y[i] - y[j])**2.)
-            else:
-                dist[i,j] = np.inf
-
-    # Minimum distance / 2 = cell "radius"
-    rad = (np.min(dist) / 2) + (np.min(dist) / padfrac)
-
-    # Calculate the distance between each vertex and all scatter points
-    dist2 = np.zeros([Nv,N])
-    for i in range(Nv):
-        for j in range(N):
-            dist2[i,j] = np.sqrt((x[i] - Nx[j])**2. + (y[i] - Ny[j])**2.)
-
-    # For each vertex, check which scatter points lie within a circle of radius rad
-    ptcolor = np.ones([Nv,4])
-    for i in range(Nv):
-        # isolate points within radius
-        tmask = dist2[i,:] < rad
-        # if there are no points in radius (there should be points!)
-        if np.sum(tmask) == 0:
-            # Set color to red for error
-            ptcolor[i,:] = [1.0,0.0,0.0,1.0]
-            print("Error: No points found in hexbin")
-        # otherwise set color to median value of points within radius
-        else:
-            ptcolor[i,:] = scalarMap.to_rgba(np.median(cval[tmask]))
-
-    for offc in xrange(verts.shape[0]):
-        binx,biny = verts[offc][0],verts[offc][1]
-        if counts[offc]:
-            ax.plot(binx,biny,'o',zorder=100, ms=ms, color=ptcolor[offc], markeredgecolor=ptcolor[offc])
+def hexbin_extent(x, y):
+    """Data extent used to lay out the hexagonal grid.
+
+    Mirrors the defaults of `matplotlib.axes.Axes.hexbin` so that the cells
+    computed by `hexbin_index` line up with a hexbin drawn with the same
+    ``gridsize`` and ``extent``.
+
+    Parameters
+    ----------
+    x : array
+        X-values of the points
+    y : array
+        Y-values of the points
+
+    Returns
+    -------
+    extent : tuple
+        ``(xmin, xmax, ymin, ymax)``
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    fin = np.isfinite(x) & np.isfinite(y)
+    if not np.any(fin):
+        return (0.0, 1.0, 0.0, 1.0)
+    xmin, xmax = x[fin].min(), x[fin].max()
+    ymin, ymax = y[fin].min(), y[fin].max()
+    # Expand singular ranges the same way matplotlib does
+    xmin, xmax = mpl.transforms.nonsingular(xmin, xmax, expander=0.1)
+    ymin, ymax = mpl.transforms.nonsingular(ymin, ymax, expander=0.1)
+    return (xmin, xmax, ymin, ymax)
+
+def hexbin_index(x, y, gridsize=25, extent=None):
+    """Assign every (x, y) point to its hexagonal cell in one vectorized pass.
+
+    Uses the same two-lattice hexagon arithmetic as
+    `matplotlib.axes.Axes.hexbin`, so no distance matrices are built and
+    memory grows as O(N).
+
+    Parameters
+    ----------
+    x : array
+        X-values of the points
+    y : array
+        Y-values of the points (same length as x)
+    gridsize : int or tuple
+        Number of hexagons in the x-direction, or ``(nx, ny)``
+    extent : tuple (optional)
+        ``(xmin, xmax, ymin, ymax)`` of the grid. Defaults to `hexbin_extent`
+
+    Returns
+    -------
+    cell : np.ndarray
+        Integer cell index of each point, -1 for points outside the grid
+        or with non-finite coordinates
+    offsets : np.ndarray
+        ``(Ncells, 2)`` array of hexagon centers, in the same order as the
+        offsets of the matplotlib hexbin collection before ``mincnt`` masking
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    if extent is None:
+        extent = hexbin_extent(x, y)
+    xmin, xmax, ymin, ymax = extent
+
+    if np.iterable(gridsize):
+        nx, ny = gridsize
+    else:
+        nx = gridsize
+        ny = int(nx / np.sqrt(3))
+
+    # Two interleaved lattices of hexagon centers
+    nx1, ny1 = nx + 1, ny + 1
+    nx2, ny2 = nx, ny
+    n1 = nx1 * ny1
+
+    # Same padding as matplotlib to avoid roundoff at the edges
+    padding = 1.e-9 * (xmax - xmin)
+    xmin -= padding
+    xmax += padding
+    sx = (xmax - xmin) / nx
+    sy = (ymax - ymin) / ny
+
+    # Position in hexagon index coordinates
+    ix = (x - xmin) / sx
+    iy = (y - ymin) / sy
+    fin = np.isfinite(ix) & np.isfinite(iy)
+    ix = np.where(fin, ix, -1.0)
+    iy = np.where(fin, iy, -1.0)
+    ix1 = np.round(ix).astype(int)
+    iy1 = np.round(iy).astype(int)
+    ix2 = np.floor(ix).astype(int)
+    iy2 = np.floor(iy).astype(int)
+
+    # Pick the nearer of the two candidate centers
+    d1 = (ix - ix1) ** 2 + 3.0 * (iy - iy1) ** 2
+    d2 = (ix - ix2 - 0.5) ** 2 + 3.0 * (iy - iy2 - 0.5) ** 2
+    bdist = d1 < d2
+
+    in1 = (0 <= ix1) & (ix1 < nx1) & (0 <= iy1) & (iy1 < ny1)
+    in2 = (0 <= ix2) & (ix2 < nx2) & (0 <= iy2) & (iy2 < ny2)
+    cell = np.where(bdist,
+                    np.where(in1, ix1 * ny1 + iy1, -1),
+                    np.where(in2, n1 + ix2 * ny2 + iy2, -1))
+    cell[~fin] = -1
+
+    # Hexagon centers for both lattices
+    offsets = np.zeros((n1 + nx2 * ny2, 2))
+    offsets[:n1, 0] = np.repeat(np.arange(nx1), ny1)
+    offsets[:n1, 1] = np.tile(np.arange(ny1), nx1)
+    offsets[n1:, 0] = np.repeat(np.arange(nx2), ny2) + 0.5
+    offsets[n1:, 1] = np.tile(np.arange(ny2), nx2) + 0.5
+    offsets[:, 0] = offsets[:, 0] * sx + xmin
+    offsets[:, 1] = offsets[:, 1] * sy + ymin
+
+    return cell, offsets
+
+def hexbin_median(cell, z, ncells):
+    """Median of z in every hexagonal cell, as a single grouped reduction.
+
+    Parameters
+    ----------
+    cell : array
+        Cell index of each point from `hexbin_index` (-1 is ignored)
+    z : array
+        Values to reduce (same length as cell). NaNs are ignored
+    ncells : int
+        Total number of cells
+
+    Returns
+    -------
+    median : np.ndarray
+        Median of z per cell, NaN for empty cells
+    counts : np.ndarray
+        Number of points per cell
+    """
+    return grouped_quantile(cell, z, ncells, q=0.5)
+
+def iter_chunks(x, y, z, chunksize=1000000):
+    """Yield ``(x, y, z)`` slices of arrays (e.g. `numpy.memmap`) without
+    loading them into memory all at once.
+
+    Parameters
+    ----------
+    x, y, z : array
+        Arrays of the same length
+    chunksize : int
+        Number of rows per chunk
+
+    Yields
+    ------
+    chunk : tuple
+        ``(x, y, z)`` slices of at most chunksize rows
+    """
+    for i in range(0, len(x), chunksize):
+        yield x[i:i+chunksize], y[i:i+chunksize], z[i:i+chunksize]
+
+def hexbin_accumulate(chunks, reducer='median', gridsize=25, extent=None):
+    """Stream chunks of points through a per-hexagon reducer.
+
+    Parameters
+    ----------
+    chunks : iterable
+        Iterable of ``(x, y, z)`` array chunks, e.g. from `iter_chunks`
+    reducer : str, float, callable or HexReducer
+        Reduction of z per hexagon (see `jakely.plot.hexbin_reducers.get_reducer`).
+        Only mergeable reducers run in memory independent of the number of points
+    gridsize : int or tuple
+        Number of hexagons in the x-direction, or ``(nx, ny)``
+    extent : tuple
+        ``(xmin, xmax, ymin, ymax)`` of the grid. Must be known before the
+        first chunk, e.g. from `hexbin_extent`
+
+    Returns
+    -------
+    offsets : np.ndarray
+        ``(Ncells, 2)`` array of hexagon centers
+    counts : np.ndarray
+        Number of points per hexagon
+    values : np.ndarray
+        Reduced z per hexagon, NaN for empty hexagons
+    """
+    reducer = get_reducer(reducer)
+    counts = None
+
+    for x, y, z in chunks:
+        cell, offsets = hexbin_index(x, y, gridsize=gridsize, extent=extent)
+        if counts is None:
+            counts = np.zeros(len(offsets))
+            reducer.start(len(offsets))
+        counts += np.bincount(cell[cell >= 0], minlength=len(offsets))
+        reducer.update(cell, z)
+
+    if counts is None:
+        # No chunks: empty grid
+        cell, offsets = hexbin_index([], [], gridsize=gridsize, extent=extent)
+        counts = np.zeros(len(offsets))
+        reducer.start(len(offsets))
+
+    return offsets, counts, reducer.result()
+
+def add_hexbin_points(ax, h, Nx, Ny, cval, ms=2., cmap='Greys', gridsize=25,
+                      extent=None, reducer='median'):
+    """Overplot a dot on every hexagon of h colored by the reduced value
+    within it.
+
+    The points are binned again with gridsize and extent, which must be the
+    ones passed to ``ax.hexbin``: the dots are placed at the hexagon centers
+    of h (``h.get_offsets()``), and a ValueError is raised if these are not
+    centers of the same grid.
+
+    Parameters
+    ----------
+    ax : matplotlib.pyplot axis object
+        Axis containing the hexbin
+    h : matplotlib.collections.PolyCollection
+        Hexbin collection returned by ``ax.hexbin``
+    Nx : array
+        X-values of the points
+    Ny : array
+        Y-values of the points
+    cval : array
+        Values to reduce in each hexagon
+    ms : float
+        Dot marker size
+    cmap : str
+        Matplotlib Colormap name for the dots
+    gridsize : int or tuple
+        ``gridsize`` that was passed to ``ax.hexbin``
+    extent : tuple (optional)
+        ``extent`` that was passed to ``ax.hexbin``
+    reducer : str, float, callable or HexReducer
+        Reduction of cval per hexagon (default median)
+
+    Returns
+    -------
+    cNorm : matplotlib.colors.Normalize
+        Color normalization of the dots
+    """
+
+    if extent is None:
+        extent = hexbin_extent(Nx, Ny)
+
+    # Bin every point and reduce per hexagon
+    verts, counts, values = hexbin_accumulate([(Nx, Ny, cval)], reducer=reducer,
+                                              gridsize=gridsize, extent=extent)
+
+    # Find the hexagons drawn in h on the same grid
+    hverts = np.asarray(h.get_offsets(), dtype=float).reshape(-1, 2)
+    hcell, _ = hexbin_index(hverts[:,0], hverts[:,1], gridsize=gridsize, extent=extent)
+    tol = 1e-6 * np.array([extent[1] - extent[0], extent[3] - extent[2]])
+    if np.any(hcell < 0) or np.any(np.abs(verts[hcell] - hverts) > tol):
+        raise ValueError("gridsize and extent must be the ones passed to ax.hexbin")
+
+    # Only dot the hexagons drawn in h (e.g. after mincnt)
+    drawn = np.zeros(len(verts), dtype=bool)
+    drawn[hcell] = True
+    counts = np.where(drawn, counts, 0)
+
+    return _draw_hexbin_points(ax, verts, counts, values, ms=ms, cmap=cmap)
+
+def _draw_hexbin_points(ax, verts, counts, values, ms=2., cmap='Greys'):
+    """Scatter one dot per non-empty hexagon and return the color norm"""
+
+    # Only draw hexagons that contain points
+    filled = (counts > 0) & np.isfinite(values)
+    ptcolor,scalarMap,cNorm = colorize(values[filled], cmap=cmap)
+
+    ax.scatter(verts[filled,0], verts[filled,1], s=ms**2, c=ptcolor,
+               marker='o', zorder=100, edgecolors=ptcolor)
+
+    return cNorm
 
 def plot_hexbin_dots(x,y,z,ax=None,cbar_ax1=None,cbar_ax2=None,cmap_bin='Spectral_r', cmap_dots='Greys',\
-                     dotsize=4., label_hex='N per Hex', label_dots='Median Value per Hex',\
+                     dotsize=4., label_hex='N per Hex', label_dots=None,\
                      gridsize=25, cbar1_orientation='horizontal',\
-                     cbar2_orientation='vertical'):
+                     cbar2_orientation='vertical', reducer=None,\
+                     extent=None, chunksize=None):
+    """Hexbin density plot with a dot in each hexagon colored by a reduction
+    of z (median by default) over the points in that hexagon.
+
+    Parameters
+    ----------
+    x : array or iterable
+        X-values of the points. Alternatively an iterable of ``(x, y, z)``
+        chunks, in which case y and z must be None and extent must be given
+    y : array
+        Y-values of the points
+    z : array
+        Values to reduce in each hexagon
+    label_dots : str (optional)
+        Label of the dot colorbar, defaults to the label of the reducer
+    reducer : str, float, callable or HexReducer
+        Reduction of z per hexagon: ``"median"``, ``"mean"``, ``"std"``,
+        ``"count"``, ``"sum"``, ``"approx_median"``, a float quantile, a
+        function, or a `jakely.plot.hexbin_reducers.HexReducer`. Defaults to
+        ``"median"``, or ``"approx_median"`` when streaming chunks, since the
+        exact median keeps every value in memory
+    extent : tuple (optional)
+        ``(xmin, xmax, ymin, ymax)`` of the hexagonal grid
+    chunksize : int (optional)
+        Stream x, y, z (e.g. `numpy.memmap`) through the reducer in chunks of
+        this many rows instead of all at once
+
+    Returns
+    -------
+    fig : matplotlib.figure.Figure
+        Only if the axes were created here
+    """
 
     # Create figure if axes not passed as kwargs
     if (ax==None) & (cbar_ax1==None) & (cbar_ax2==None):
@@ -85,14 +345,46 @@ def plot_hexbin_dots(x,y,z,ax=None,cbar_ax1=None,cbar_ax2=None,cmap_bin='Spectra
 
     alpha1 = 0.8
 
-    # Set dot colors
-    colors,scalarMap,cNorm = colorize(z,cmap=cmap_dots)
+    # Choose the source of points and share one grid layout between the
+    # hexbin and the dots
+    if (y is None) and (z is None):
+        if extent is None:
+            print("Error: extent must be given when streaming chunks")
+            return
+        chunks = x
+    elif chunksize is not None:
+        if extent is None:
+            extent = _chunked_extent(x, y, chunksize)
+        chunks = iter_chunks(x, y, z, chunksize=chunksize)
+    else:
+        if extent is None:
+            extent = hexbin_extent(x, y)
+        chunks = [(x, y, z)]
+    streaming = (chunksize is not None) or ((y is None) and (z is None))
+
+    if reducer is None:
+        reducer = 'approx_median' if streaming else 'median'
+    reducer = get_reducer(reducer)
+    if streaming and not reducer.mergeable:
+        warnings.warn("reducer %s keeps every value in memory while streaming "
+                      "chunks, use a mergeable reducer such as 'approx_median'"
+                      % type(reducer).__name__)
+    if label_dots is None:
+        label_dots = reducer.label
+
+    # Bin every point and reduce per hexagon
+    verts, counts, values = hexbin_accumulate(chunks, reducer=reducer,
+                                              gridsize=gridsize, extent=extent)
 
-    # Create hexbins
-    h0 = ax.hexbin(x,y, alpha=alpha1, cmap=cmap_bin,gridsize=gridsize, mincnt=1)
+    # Create hexbins from the per-hexagon counts
+    filled = counts > 0
+    h0 = ax.hexbin(verts[filled,0], verts[filled,1], C=counts[filled],
+                   reduce_C_function=np.sum, alpha=alpha1, cmap=cmap_bin,
+                   gridsize=gridsize, mincnt=1, extent=extent)
 
     # Add hexbin dots
-    add_hexbin_points(ax, h0, x, y, z, ms=dotsize)
+    cNorm = _draw_hexbin_points(ax, verts, counts, values, ms=dotsize,
+                                cmap=cmap_dots)
 
     # Set hexbin colorbar
     cb1 = fig.colorbar(h0, cax=cbar_ax1, orientation=cbar1_orientation)
@@ -106,3 +398,18 @@ def plot_hexbin_dots(x,y,z,ax=None,cbar_ax1=None,cbar_ax2=None,cmap_bin='Spectra
         return fig
     else:
         return
+
+def _chunked_extent(x, y, chunksize):
+    """`hexbin_extent` computed one chunk at a time"""
+    lo = np.array([np.inf, np.inf])
+    hi = np.array([-np.inf, -np.inf])
+    for xc, yc, _ in iter_chunks(x, y, x, chunksize=chunksize):
+        xc = np.asarray(xc, dtype=float)
+        yc = np.asarray(yc, dtype=float)
+        fin = np.isfinite(xc) & np.isfinite(yc)
+        if np.any(fin):
+            lo = np.minimum(lo, [xc[fin].min(), yc[fin].min()])
+            hi = np.maximum(hi, [xc[fin].max(), yc[fin].max()])
+    if not np.all(np.isfinite(lo)):
+        return (0.0, 1.0, 0.0, 1.0)
+    return hexbin_extent([lo[0], hi[0]], [lo[1], hi[1]])
@@ -0,0 +1,336 @@
+import numpy as np
+
+from ..toolbox.quantile_sketch import HistogramSketch
+
+__all__ = ["HexReducer", "Count", "Sum", "Mean", "Std", "Quantile", "Median",
+           "ApproxQuantile", "FunctionReducer", "get_reducer", "grouped_quantile"]
+
+def grouped_quantile(cell, z, ncells, q=0.5):
+    """
+    Quantile of z in every cell, as a single sort-based grouped reduction.
+    Uses the same linear interpolation as `numpy.quantile`.
+
+    Parameters
+    ----------
+    cell : array
+        Cell index of each value (-1 is ignored)
+    z : array
+        Values to reduce (same length as cell). NaNs are ignored
+    ncells : int
+        Total number of cells
+    q : float
+        Quantile in [0, 1]
+
+    Returns
+    -------
+    quantile : np.ndarray
+        Quantile of z per cell, NaN for empty cells
+    counts : np.ndarray
+        Number of values per cell
+    """
+    cell = np.asarray(cell)
+    z = np.asarray(z, dtype=float)
+    good = (cell >= 0) & np.isfinite(z)
+    cell = cell[good]
+    z = z[good]
+
+    counts = np.bincount(cell, minlength=ncells)
+
+    # Sort by cell, then by value within each cell
+    order = np.lexsort((z, cell))
+    zs = z[order]
+
+    # Interpolate between the bracketing elements of each cell's sorted run
+    starts = np.cumsum(counts) - counts
+    filled = counts > 0
+    pos = q * (counts[filled] - 1)
+    lo = np.floor(pos).astype(int)
+    hi = np.ceil(pos).astype(int)
+    frac = pos - lo
+    zlo = zs[starts[filled] + lo]
+    zhi = zs[starts[filled] + hi]
+
+    quantile = np.full(ncells, np.nan)
+    quantile[filled] = zlo + frac * (zhi - zlo)
+
+    return quantile, counts
+
+class HexReducer(object):
+    """
+    Base class for per-hexagon reductions of z.
+
+    Reducers are fed chunks of ``(cell, z)`` through `update` and return one
+    value per cell from `result`. Mergeable reducers keep only fixed-size
+    per-cell state, so any number of chunks can be streamed through them;
+    reducers with ``mergeable = False`` keep every value in memory.
+    """
+
+    mergeable = True
+    label = ""
+
+    def start(self, ncells):
+        """Reset the state for a grid of ``ncells`` cells"""
+        self.ncells = ncells
+
+    def update(self, cell, z):
+        """Accumulate a chunk of cell indices and values"""
+        raise NotImplementedError
+
+    def merge(self, other):
+        """Fold the state of another reducer of the same type into this one"""
+        raise NotImplementedError
+
+    def result(self):
+        """Reduced value per cell, NaN for empty cells"""
+        raise NotImplementedError
+
+    @staticmethod
+    def _clean(cell, z):
+        cell = np.asarray(cell)
+        z = np.asarray(z, dtype=float)
+        good = (cell >= 0) & np.isfinite(z)
+        return cell[good], z[good]
+
+class Count(HexReducer):
+    """Number of points per hexagon"""
+
+    label = "N per Hex"
+
+    def start(self, ncells):
+        self.ncells = ncells
+        self.n = np.zeros(ncells)
+
+    def update(self, cell, z):
+        cell = np.asarray(cell)
+        self.n += np.bincount(cell[cell >= 0], minlength=self.ncells)
+
+    def merge(self, other):
+        self.n += other.n
+
+    def result(self):
+        return np.where(self.n > 0, self.n, np.nan)
+
+class Sum(HexReducer):
+    """Sum of z per hexagon"""
+
+    label = "Sum per Hex"
+
+    def start(self, ncells):
+        self.ncells = ncells
+        self.n = np.zeros(ncells)
+        self.s = np.zeros(ncells)
+
+    def update(self, cell, z):
+        cell, z = self._clean(cell, z)
+        self.n += np.bincount(cell, minlength=self.ncells)
+        self.s += np.bincount(cell, weights=z, minlength=self.ncells)
+
+    def merge(self, other):
+        self.n += other.n
+        self.s += other.s
+
+    def result(self):
+        return np.where(self.n > 0, self.s, np.nan)
+
+class Mean(Sum):
+    """Mean of z per hexagon"""
+
+    label = "Mean Value per Hex"
+
+    def result(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.n > 0, self.s / self.n, np.nan)
+
+class Std(HexReducer):
+    """
+    Standard deviation of z per hexagon, accumulated as (count, mean, M2)
+    moments and combined between chunks with the parallel algorithm of
+    Chan et al. (1979).
+
+    Parameters
+    ----------
+    ddof : int
+        Delta degrees of freedom, as in `numpy.std`
+    """
+
+    label = "Std Dev per Hex"
+
+    def __init__(self, ddof=0):
+        self.ddof = ddof
+
+    def start(self, ncells):
+        self.ncells = ncells
+        self.n = np.zeros(ncells)
+        self.mean = np.zeros(ncells)
+        self.m2 = np.zeros(ncells)
+
+    def _combine(self, n, mean, m2):
+        ntot = self.n + n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = mean - self.mean
+            self.mean = np.where(ntot > 0, self.mean + delta * n / ntot, 0.0)
+            self.m2 = np.where(ntot > 0, self.m2 + m2 + delta**2 * self.n * n / ntot, 0.0)
+        self.n = ntot
+
+    def update(self, cell, z):
+        cell, z = self._clean(cell, z)
+        n = np.bincount(cell, minlength=self.ncells).astype(float)
+        s = np.bincount(cell, weights=z, minlength=self.ncells)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, s / n, 0.0)
+        m2 = np.bincount(cell, weights=(z - mean[cell])**2, minlength=self.ncells)
+        self._combine(n, mean, m2)
+
+    def merge(self, other):
+        self._combine(other.n, other.mean, other.m2)
+
+    def result(self):
+        dof = self.n - self.ddof
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(dof > 0, np.sqrt(self.m2 / dof), np.nan)
+
+class Quantile(HexReducer):
+    """
+    Exact quantile of z per hexagon. Keeps every value in memory.
+
+    Parameters
+    ----------
+    q : float
+        Quantile in [0, 1]
+    """
+
+    mergeable = False
+
+    def __init__(self, q):
+        self.q = q
+        self.label = "%g%% Quantile per Hex" % (100 * q)
+
+    def start(self, ncells):
+        self.ncells = ncells
+        self.cells = []
+        self.values = []
+
+    def update(self, cell, z):
+        cell, z = self._clean(cell, z)
+        self.cells.append(cell)
+        self.values.append(z)
+
+    def merge(self, other):
+        self.cells.extend(other.cells)
+        self.values.extend(other.values)
+
+    def _gather(self):
+        if len(self.cells) == 0:
+            return np.zeros(0, dtype=int), np.zeros(0)
+        return np.concatenate(self.cells), np.concatenate(self.values)
+
+    def result(self):
+        cell, z = self._gather()
+        return grouped_quantile(cell, z, self.ncells, q=self.q)[0]
+
+class Median(Quantile):
+    """Exact median of z per hexagon. Keeps every value in memory."""
+
+    def __init__(self):
+        Quantile.__init__(self, 0.5)
+        self.label = "Median Value per Hex"
+
+class ApproxQuantile(HexReducer):
+    """
+    Approximate quantile of z per hexagon from a mergeable histogram sketch
+    (see `jakely.toolbox.quantile_sketch.HistogramSketch`). Memory is fixed at
+    ``ncells * bins`` regardless of the number of points.
+
+    Parameters
+    ----------
+    q : float
+        Quantile in [0, 1]
+    bins : int
+        Histogram bins per hexagon
+    range : tuple (optional)
+        Known ``(min, max)`` of z, which avoids re-binning as the range grows
+    """
+
+    def __init__(self, q=0.5, bins=256, range=None):
+        self.q = q
+        self.bins = bins
+        self.range = range
+        self.label = "~%g%% Quantile per Hex" % (100 * q)
+
+    def start(self, ncells):
+        self.ncells = ncells
+        self.sketch = HistogramSketch(ngroups=ncells, bins=self.bins, range=self.range)
+
+    def update(self, cell, z):
+        self.sketch.update(z, group=cell)
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+
+    def result(self):
+        return self.sketch.quantile(self.q)
+
+class FunctionReducer(Quantile):
+    """
+    Apply a user-supplied function to the values in each hexagon, e.g.
+    ``FunctionReducer(np.ptp)``. Keeps every value in memory and calls the
+    function once per non-empty hexagon.
+
+    Parameters
+    ----------
+    func : callable
+        Function mapping a 1D array of values to a scalar
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.label = "%s per Hex" % getattr(func, "__name__", "Value")
+
+    def result(self):
+        cell, z = self._gather()
+        order = np.lexsort((z, cell))
+        cell, z = cell[order], z[order]
+        counts = np.bincount(cell, minlength=self.ncells)
+        starts = np.cumsum(counts) - counts
+        out = np.full(self.ncells, np.nan)
+        # One call per non-empty hexagon on its contiguous run of values
+        for i in np.nonzero(counts)[0]:
+            out[i] = self.func(z[starts[i]:starts[i] + counts[i]])
+        return out
+
+REDUCERS = {
+    "count" : Count,
+    "sum" : Sum,
+    "mean" : Mean,
+    "std" : Std,
+    "median" : Median,
+    "approx_median" : ApproxQuantile,
+}
+
+def get_reducer(reducer):
+    """
+    Get a fresh reducer instance.
+
+    Parameters
+    ----------
+    reducer : str, float, callable or HexReducer
+        One of ``"count"``, ``"sum"``, ``"mean"``, ``"std"``, ``"median"`` or
+        ``"approx_median"``, a float quantile in [0, 1], any function mapping
+        an array to a scalar, or a `HexReducer` instance
+
+    Returns
+    -------
+    reducer : HexReducer
+    """
+    if isinstance(reducer, HexReducer):
+        return reducer
+    elif isinstance(reducer, str):
+        if reducer not in REDUCERS:
+            raise ValueError("Unknown reducer '%s'. Use one of %s" %(reducer, sorted(REDUCERS)))
+        return REDUCERS[reducer]()
+    elif isinstance(reducer, float):
+        return Quantile(reducer)
+    elif callable(reducer):
+        return FunctionReducer(reducer)
+    else:
+        raise ValueError("reducer must be a str, float, callable or HexReducer")
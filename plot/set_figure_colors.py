@@ -1,3 +1,5 @@
+import numpy as np
+
 def set_foregroundcolor(ax, color):
     """For the specified axes, sets the color of the frame,
     major ticks, tick labels, axis labels, title and legend.
@@ -94,18 +96,28 @@ def determine_contrasting_color(color):
         A string hex color that is either black or white 
     """
 
-    # Get RGB
-    R = color[0] * 255
-    G = color[1] * 255
-    B = color[2] * 255
+    return str(contrasting_colors(color))
+
+def contrasting_colors(colors):
+    """
+    Array version of `determine_contrasting_color`: black or white text color
+    for every color in an array, computed with one set of NumPy operations.
+
+    Parameters
+    ----------
+    colors : array
+        RGB or RGBA colors with shape ``(..., 3)`` or ``(..., 4)``
+
+    Returns
+    -------
+    textcolors : np.ndarray
+        Array of shape ``colors.shape[:-1]`` of ``"#000000"`` or ``"#ffffff"``
+    """
+
+    colors = np.asarray(colors, dtype=float)
 
     # Calculate grey "brightness"
-    grey = (R*0.299 + G*0.587 + B*0.114)
+    grey = 255 * (colors[..., 0]*0.299 + colors[..., 1]*0.587 + colors[..., 2]*0.114)
 
     # Set text color based on brightness
-    if grey > 186:
-        textcolor = "#000000"
-    else:
-        textcolor = "#ffffff"
-
-    return textcolor
+    return np.where(grey > 186, "#000000", "#ffffff")
@@ -0,0 +1,59 @@
+import numpy as np
+
+from jakely.ispectrum import cie
+
+# Reference values computed with ColorPy (ciexyz.xyz_from_wavelength,
+# ciexyz.xyz_from_spectrum, colormodels.rgb_from_xyz and
+# colormodels.irgb_string_from_xyz) with its default settings
+REFERENCE = [
+    (380.0, [0.003712943488774197, 0.0001058514591097907, 0.017506205566913055],
+     [0.0031420215229865144, -0.0026727015737728886, 0.01868852069017497], "#100025"),
+    (450.0, [0.9124938603259394, 0.10313731913261658, 4.809754594950031],
+     [0.40060819866382785, -0.4910769800732963, 5.113498066829294], "#6F00FF"),
+    (555.0, [1.389775646726006, 2.7141399771741206, 0.015606302154611217],
+     [0.323766484369258, 3.7452557110561804, -0.4598132717345739], "#78FF00"),
+    (600.5, [2.880971647635069, 1.6951914401284633, 0.0021183319693848577],
+     [6.7299274875362745, 0.3878486421457318, -0.18327229577996101], "#FF5100"),
+    (700.0, [0.030830350263117184, 0.011133402186368243, 0.0],
+     [0.0828039332707063, -0.008996220113995052, -0.0005558626778398401], "#510015"),
+]
+
+# Flat spectrum on 360-830 nm with a total intensity of the display intensity
+FLAT_XYZ = [1.000080035889627, 0.9999999999999991, 1.0003306681347595]
+FLAT_RGB = [1.205070523263903, 0.9482150892906424, 0.9089785942529228]
+FLAT_IRGB = "#FFE6E1"
+
+def test_wavelengths_match_colorpy():
+    for wl, xyz_ref, rgb_ref, irgb_ref in REFERENCE:
+        xyz = cie.xyz_from_wavelength(wl)
+        assert np.allclose(xyz, xyz_ref, rtol=1e-10, atol=1e-14)
+        assert np.allclose(cie.rgb_from_xyz(xyz), rgb_ref, rtol=1e-10, atol=1e-14)
+        assert cie.irgb_string_from_xyz(xyz) == irgb_ref
+
+def test_flat_spectrum_matches_colorpy():
+    wl = np.arange(360.0, 831.0)
+    spectrum = np.full(len(wl), cie.DEFAULT_DISPLAY_INTENSITY / len(wl))
+    xyz = cie.xyz_from_spectrum(wl, spectrum)
+    assert np.allclose(xyz, FLAT_XYZ, rtol=1e-10)
+    assert np.allclose(cie.rgb_from_xyz(xyz), FLAT_RGB, rtol=1e-10)
+    assert cie.irgb_string_from_xyz(xyz) == FLAT_IRGB
+
+# ColorPy colormodels.irgb_from_rgb and irgb_string_from_rgb of grey,
+# out of gamut (negative channel) and all-negative colors
+IRGB_REFERENCE = [
+    ([0.5, 0.5, 0.5], [188, 188, 188], "#BCBCBC"),
+    ([0.0, 0.0, 0.0], [0, 0, 0], "#000000"),
+    ([1.2, 1.2, 1.2], [255, 255, 255], "#FFFFFF"),
+    ([-0.2, 0.6, 0.3], [0, 203, 165], "#00CBA5"),
+    ([0.9, -0.1, -0.3], [243, 108, 0], "#F36C00"),
+    ([-0.2, -0.1, -0.4], [124, 149, 0], "#7C9500"),
+    ([-0.3, -0.3, -0.3], [0, 0, 0], "#000000"),
+]
+
+def test_irgb_from_rgb_matches_colorpy():
+    for rgb, irgb_ref, string_ref in IRGB_REFERENCE:
+        assert cie.irgb_from_rgb(rgb).tolist() == irgb_ref
+        assert cie.irgb_string_from_rgb(rgb) == string_ref
+    # All colors at once
+    rgbs = [rgb for rgb, _, _ in IRGB_REFERENCE]
+    assert cie.irgb_from_rgb(rgbs).tolist() == [irgb for _, irgb, _ in IRGB_REFERENCE]
@@ -0,0 +1,62 @@
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+from jakely.plot.color_corner import CornerHistograms, PCA_corner_stream
+from jakely.toolbox.streaming_pca import StreamingPCA, iter_rows
+
+
+def _data(M=400, d=5, seed=3):
+    rng = np.random.RandomState(seed)
+    return rng.normal(size=(M, d)) * np.arange(1, d + 1)
+
+
+def test_corner_histograms_match_numpy():
+    data = _data()[:, :3]
+    bins = 8
+    hists = CornerHistograms(data.min(axis=0), data.max(axis=0), bins=bins)
+    # Chunks add up to the histograms of the whole sample
+    for chunk in iter_rows(data, chunksize=50):
+        hists.update(chunk)
+
+    for i in range(3):
+        h1, _ = np.histogram(data[:, i], bins=hists.edges(i))
+        assert np.array_equal(hists.hist1d[i], h1)
+        for j in range(i):
+            h2, _, _ = np.histogram2d(data[:, i], data[:, j],
+                                      bins=[hists.edges(i), hists.edges(j)])
+            assert np.array_equal(hists.hist2d[i, j], h2)
+
+
+def test_corner_histograms_from_array():
+    data = _data()[:, :3]
+    whole = CornerHistograms.from_array(data, bins=8)
+    assert np.all(whole.hist1d.sum(axis=1) == len(data))
+    assert np.allclose(np.sum(whole.density(0)) * (whole.hi[0] - whole.lo[0]) / 8, 1.0)
+
+
+def test_pca_corner_stream(tmp_path):
+    X = _data()
+    data = np.memmap(str(tmp_path / "features.dat"), dtype=float, mode="w+",
+                     shape=X.shape)
+    data[:] = X
+    data.flush()
+
+    fig, pca = PCA_corner_stream(data, N=3, chunksize=64, bins=16, return_pca=True)
+    plt.close(fig)
+    ref = StreamingPCA(3).fit([X])
+    assert np.allclose(pca.components_, ref.components_)
+
+    # A function returning fresh iterators gives the same fit
+    fig, pca2 = PCA_corner_stream(lambda: iter_rows(data, chunksize=64), N=3,
+                                  bins=16, return_pca=True)
+    plt.close(fig)
+    assert np.allclose(pca2.components_, ref.components_)
+
+
+def test_pca_corner_stream_rejects_generators():
+    X = _data()
+    with pytest.raises(ValueError):
+        PCA_corner_stream(iter_rows(X, chunksize=64), N=3)
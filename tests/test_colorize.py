@@ -0,0 +1,27 @@
+import numpy as np
+
+from jakely import colorize, colorize_lut
+from jakely.colorize import fit_norm
+
+def test_masked_values_ignored():
+    data = np.ma.array([1.0, 2.0, 100.0], mask=[0, 0, 1])
+    vcolors, scalarmap, cNorm = colorize(data)
+    assert cNorm.vmin == 1.0
+    assert cNorm.vmax == 2.0
+
+def test_masked_values_ignored_in_chunks():
+    data = np.ma.array(np.arange(10.0), mask=[0] * 9 + [1])
+    cNorm = fit_norm(iter([data[:5], data[5:]]))
+    assert cNorm.vmax == 8.0
+    out = colorize_lut(data, chunksize=4)
+    assert np.array_equal(out[8], colorize_lut(np.array([0.0, 8.0]))[1])
+
+def test_masked_values_get_bad_color():
+    data = np.ma.array([1.0, 2.0, 100.0, 3.0], mask=[0, 0, 1, 0])
+    vcolors = colorize(data)[0]
+    for norm in ('linear', 'log'):
+        out = colorize_lut(data, norm=norm, chunksize=2)
+        nan = colorize_lut(np.array([1.0, np.nan, 3.0]), norm=norm)
+        assert np.array_equal(out[2], nan[1])
+    # Same color as colorize
+    assert np.array_equal(out[2], np.round(np.asarray(vcolors[2]) * 255))
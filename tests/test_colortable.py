@@ -0,0 +1,20 @@
+import numpy as np
+
+from jakely import colorize
+from jakely.plot.colortable import colortable_cells
+
+
+def test_colortable_cells_limits_and_infs():
+    data = np.array([[1.0, np.inf, -np.inf], [np.nan, 5.0, 0.0]])
+    _, smap, cnorm = colorize(data.ravel(), vmin=0.5, vmax=4.0)
+
+    _, _, texts = colortable_cells(data, smap, cnorm, cmin=0.5, cmax=4.0,
+                                   nantext="--")
+    assert texts.tolist() == [["1.0", "$>$4.0", "$<$0.5"],
+                              ["--", "$>$4.0", "$<$0.5"]]
+
+    # Without limits infs get the placeholder, or are printed
+    _, _, texts = colortable_cells(data, smap, cnorm, nantext="--")
+    assert texts.tolist() == [["1.0", "--", "--"], ["--", "5.0", "0.0"]]
+    _, _, texts = colortable_cells(data, smap, cnorm, nantext=None)
+    assert texts.tolist() == [["1.0", "inf", "-inf"], ["nan", "5.0", "0.0"]]
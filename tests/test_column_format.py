@@ -0,0 +1,86 @@
+import io
+
+import numpy as np
+
+from jakely.toolbox.column_format import format_column, align_decimal
+from jakely.toolbox.deluxetable import write_deluxetable
+
+
+def test_numbers_and_nantext():
+    values = np.array([1.0, np.nan, np.inf, -np.inf, 2.5])
+    assert format_column(values).tolist() == ['1.00', 'nan', 'inf', '-inf', '2.50']
+    assert format_column(values, nantext='--').tolist() == ['1.00', '--', '--', '--', '2.50']
+    assert format_column(np.arange(3), fmt='%i').tolist() == ['0', '1', '2']
+
+
+def test_masked():
+    values = np.ma.array([1.0, 2.0, 3.0], mask=[False, True, False])
+    assert format_column(values).tolist() == ['1.00', '', '3.00']
+    assert format_column(values, nantext='--').tolist() == ['1.00', '--', '3.00']
+
+    strings = np.ma.array(['a', 'b'], mask=[True, False])
+    assert format_column(strings, nantext='--').tolist() == ['--', 'b']
+
+
+def test_strings_and_bytes():
+    assert format_column(np.array(['a', 'bc'])).tolist() == ['a', 'bc']
+    assert format_column(np.array([b'a', b'bc'])).tolist() == ['a', 'bc']
+    # fmt only applies to numbers
+    assert format_column(np.array(['1.234']), fmt='%.1f').tolist() == ['1.234']
+
+
+def test_shape():
+    texts = format_column(np.arange(6.).reshape(2, 3), fmt='%.0f')
+    assert texts.shape == (2, 3)
+    assert texts[1, 2] == '5'
+
+
+def test_symmetric_errors():
+    values = np.array([1.0, 2.0, np.nan])
+    errors = np.array([0.1, np.nan, 0.3])
+    texts = format_column(values, errors=errors, pm=' +- ', errfmt='%.1f')
+    assert texts.tolist() == ['1.00 +- 0.1', '2.00', 'nan']
+
+
+def test_asymmetric_errors():
+    values = np.array([1.0, 2.0])
+    errors = [np.array([0.1, 0.2]), np.array([0.3, 0.4])]
+    texts = format_column(values, errors=errors, fmt='%.1f')
+    assert texts.tolist() == ['1.0$^{+0.1}_{-0.3}$', '2.0$^{+0.2}_{-0.4}$']
+
+
+def test_skip_nan_errors():
+    values = np.ma.array([1.0, np.nan, 3.0], mask=[False, False, True])
+    errors = [np.array([0.1, 0.2, 0.3]), np.array([np.nan, 0.5, 0.6])]
+    kept = format_column(values, errors=errors, fmt='%.1f')
+    assert kept.tolist() == ['1.0', 'nan', '']
+    texts = format_column(values, errors=errors, fmt='%.1f', skip_nan_errors=False)
+    assert texts.tolist() == ['1.0$^{+0.1}_{-nan}$', 'nan$^{+0.2}_{-0.5}$', '']
+
+
+def test_two_row_errors():
+    # With two rows, symmetric errors and [plus, minus] both have length 2
+    def write(errors):
+        buf = io.StringIO()
+        write_deluxetable(buf, ['a'], data=[np.array([1.0, 2.0])],
+                          errors=[errors], fmt='%.1f', chunksize=1)
+        return buf.getvalue()
+
+    symmetric = write(np.array([0.1, 0.2]))
+    assert r'1.0 $\pm$ 0.1\\' in symmetric
+    assert r'2.0 $\pm$ 0.2' in symmetric
+
+    asymmetric = write([np.array([0.1, 0.2]), np.array([0.3, 0.4])])
+    assert r'1.0$^{+0.1}_{-0.3}$\\' in asymmetric
+    assert r'2.0$^{+0.2}_{-0.4}$' in asymmetric
+
+
+def test_align_decimal():
+    aligned = align_decimal(['1.5', '-10.25', '100', 'n/a'])
+    assert aligned.tolist() == ['  1.5 ', '-10.25', '100   ', 'n/a   ']
+    points = [s.find('.') for s in aligned.tolist() if '.' in s]
+    assert len(set(points)) == 1
+
+    texts = format_column(np.array([1.5, 22.25]), fmt='%.2f', align=True)
+    assert texts.tolist() == [' 1.50', '22.25']
+    assert align_decimal([]).tolist() == []
@@ -0,0 +1,68 @@
+import io
+
+import numpy as np
+
+from jakely.toolbox.deluxetable import deluxetable, write_deluxetable
+
+
+def _write(*args, **kwargs):
+    buf = io.StringIO()
+    write_deluxetable(buf, *args, **kwargs)
+    return buf.getvalue()
+
+
+def _data(n=7):
+    x = np.arange(n) * 1.5
+    y = np.sqrt(np.arange(n) + 1.0)
+    return [x, y]
+
+
+def test_footnote_letters_roll_over():
+    # 28 markers: a ... z, aa, ab
+    names = ['x#', 'y']
+    col = np.array(['#'] * 27)
+    comments = ['note %i' % i for i in range(28)]
+    text = _write(names, data=[col, np.arange(27.)], comments=comments)
+
+    letters = [chr(ord('a') + i) for i in range(26)] + ['aa', 'ab']
+    marks = [r'\tablenotemark{%s}' % letter for letter in letters]
+    positions = [text.find(mark) for mark in marks]
+    assert all(p >= 0 for p in positions)
+    assert positions == sorted(positions)
+    assert r'\tablenotemark{ac}' not in text
+    for letter, comment in zip(letters, comments):
+        assert '\\tablenotetext{%s}{%s}\n' % (letter, comment) in text
+
+
+def test_chunks_match_single_chunk():
+    names = ['a', 'b#']
+    data = _data()
+    whole = _write(names, data=data, comments=['one'], chunksize=100)
+    assert _write(names, data=data, comments=['one'], chunksize=2) == whole
+    assert _write(names, data=data, comments=['one'], chunksize=1) == whole
+    assert _write(names, rows=zip(*data), comments=['one'], chunksize=3) == whole
+
+
+def test_rows_match_data():
+    names = ['a', 'b']
+    data = _data()
+    assert _write(names, rows=list(zip(*data))) == _write(names, data=data)
+    # deluxetable gives the same text
+    assert str(deluxetable(colnames=names, data=data)) == _write(names, data=data)
+
+
+def test_tablenotetext():
+    text = _write(['a#', 'b#'], data=_data(2), comments=['first', 'second', 'unused'])
+    assert r'\colhead{a\tablenotemark{a}}' in text
+    assert r'\colhead{b\tablenotemark{b}}' in text
+    notes = [line for line in text.splitlines() if line.startswith(r'\tablenotetext')]
+    assert notes == [r'\tablenotetext{a}{first}', r'\tablenotetext{b}{second}']
+
+
+def test_tablecomments():
+    text = _write(['a', 'b'], data=_data(2))
+    assert r'\tablecomments' not in text
+    assert text.rstrip().endswith(r'\enddata' + '\n' + r'\end{deluxetable*}')
+
+    text = _write(['a', 'b'], data=_data(2), comments='A comment.')
+    assert '\\tablecomments{A comment.}\n' in text
@@ -0,0 +1,49 @@
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+from jakely.plot.hexbin_dots import (hexbin_extent, hexbin_index, hexbin_median,
+                                     add_hexbin_points)
+
+
+def _data(n=2000, seed=1):
+    rng = np.random.RandomState(seed)
+    x = rng.normal(size=n)
+    y = rng.normal(size=n) * 2.0 + 1.0
+    z = rng.uniform(size=n)
+    return x, y, z
+
+
+@pytest.mark.parametrize("gridsize", [7, 15, (12, 5)])
+def test_hexbin_median_matches_matplotlib(gridsize):
+    x, y, z = _data()
+    extent = hexbin_extent(x, y)
+    fig, ax = plt.subplots()
+    h = ax.hexbin(x, y, C=z, reduce_C_function=np.median, gridsize=gridsize,
+                  extent=extent)
+    plt.close(fig)
+
+    cell, offsets = hexbin_index(x, y, gridsize=gridsize, extent=extent)
+    median, counts = hexbin_median(cell, z, len(offsets))
+    filled = counts > 0
+
+    assert np.all(cell >= 0)
+    assert np.allclose(offsets[filled], h.get_offsets())
+    assert np.allclose(median[filled], h.get_array())
+
+
+def test_add_hexbin_points():
+    x, y, z = _data()
+    extent = hexbin_extent(x, y)
+    fig, ax = plt.subplots()
+    h = ax.hexbin(x, y, gridsize=10, extent=extent, mincnt=5)
+    add_hexbin_points(ax, h, x, y, z, gridsize=10, extent=extent)
+    dots = ax.collections[-1]
+    assert np.allclose(dots.get_offsets(), h.get_offsets())
+
+    # Dots on a different grid than the hexbin
+    with pytest.raises(ValueError):
+        add_hexbin_points(ax, h, x, y, z, gridsize=12, extent=extent)
+    plt.close(fig)
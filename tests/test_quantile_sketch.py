@@ -0,0 +1,33 @@
+import numpy as np
+
+from jakely.toolbox.quantile_sketch import HistogramSketch
+
+def test_median_per_group():
+    rng = np.random.default_rng(42)
+    ngroups = 51
+    group = rng.integers(0, ngroups - 1, 20000)
+    values = rng.normal(loc=group * 0.1, scale=1.0 + 0.05 * group)
+    # One sparse group with widely spread values
+    group[:6] = ngroups - 1
+    values[:6] = [-8.0, -3.0, 0.5, 2.0, 6.0, 9.0]
+    sk = HistogramSketch(ngroups=ngroups, bins=128)
+    for i in range(0, len(values), 3000):
+        sk.update(values[i:i+3000], group=group[i:i+3000])
+
+    width = (sk.hi - sk.lo) / sk.bins
+    approx = sk.quantile(0.5)
+    for g in range(ngroups):
+        exact = np.median(values[group == g])
+        assert abs(approx[g] - exact) <= width
+
+def test_sparse_group_interpolates():
+    sk = HistogramSketch(bins=64)
+    sk.update([0.0, 10.0])
+    width = (sk.hi - sk.lo) / sk.bins
+    assert abs(sk.quantile(0.5) - 5.0) <= width
+
+def test_zero_width_range_grows():
+    sk = HistogramSketch(bins=16, range=(2.0, 2.0))
+    sk.update([1.0, 2.0, 3.0])
+    assert sk.lo <= 1.0 and sk.hi >= 3.0
+    assert sk.total[0] == 3
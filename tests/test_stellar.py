@@ -0,0 +1,25 @@
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+from jakely.ispectrum import stellar
+from jakely.ispectrum.colorpy_wrapper import plot_spectrum
+
+
+def test_weight_spectrum_normalize():
+    wl = np.linspace(400., 800., 200)
+    albedo = np.full(wl.shape, 0.3)
+    for star in stellar.list_stars():
+        spectrum = stellar.weight_spectrum(wl, albedo, star, normalize=True)
+        assert np.isclose(np.nanmean(spectrum), 0.3)
+
+
+def test_plot_spectrum_adleo_not_black():
+    # The absolute flux of AD Leo (~1e-12 W/m^2/um) used to give #000000
+    wl = np.linspace(380., 780., 400)
+    albedo = np.full(wl.shape, 0.3)
+    fig = plot_spectrum(wl, albedo, stellar_spec="AD Leo")
+    color = fig.axes[0].get_facecolor()[:3]
+    plt.close(fig)
+    assert max(color) > 0.5
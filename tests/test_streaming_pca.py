@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from jakely.toolbox.streaming_pca import StreamingPCA, iter_rows
+
+
+def _memmap(tmp_path, M=500, d=6, seed=2):
+    rng = np.random.RandomState(seed)
+    X = rng.normal(size=(M, d)) * np.arange(1, d + 1) + rng.normal(size=d)
+    data = np.memmap(str(tmp_path / "features.dat"), dtype=float, mode="w+",
+                     shape=X.shape)
+    data[:] = X
+    data.flush()
+    return data, X
+
+
+def test_streaming_pca_matches_svd(tmp_path):
+    data, X = _memmap(tmp_path)
+    pca = StreamingPCA(n_components=3).fit(iter_rows(data, chunksize=64))
+
+    Xc = X - X.mean(axis=0)
+    _, s, vt = np.linalg.svd(Xc, full_matrices=False)
+
+    assert np.allclose(pca.mean, X.mean(axis=0))
+    assert np.allclose(pca.explained_variance_, s[:3]**2 / (len(X) - 1))
+    # Components are defined up to their sign
+    assert np.allclose(np.abs(np.sum(pca.components_ * vt[:3], axis=1)), 1.0)
+    assert np.allclose(np.abs(pca.transform(X)), np.abs(np.dot(Xc, vt[:3].T)))
+
+
+def test_streaming_pca_chunking_and_nans(tmp_path):
+    data, X = _memmap(tmp_path)
+    whole = StreamingPCA().fit([X])
+    chunked = StreamingPCA().fit(iter_rows(data, chunksize=7))
+    assert np.allclose(whole.components_, chunked.components_)
+
+    # Rows with NaNs are skipped
+    Xn = np.vstack([X, np.full((1, X.shape[1]), np.nan)])
+    nans = StreamingPCA().fit(iter_rows(Xn, chunksize=100))
+    assert nans.n == len(X)
+    assert np.allclose(whole.components_, nans.components_)
+
+
+def test_streaming_pca_too_few_samples():
+    with pytest.raises(ValueError):
+        StreamingPCA().fit([np.ones((1, 3))])
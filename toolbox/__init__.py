@@ -6,6 +6,11 @@ Created on Fri Mar  4 13:39:45 2016
 """
 
 from .find_nearest import find_nearest
-from .deluxetable import deluxetable
+from .deluxetable import deluxetable, write_deluxetable
+from .column_format import format_column, align_decimal
 from .say import say
 from .print2 import print2
+from .quantile_sketch import HistogramSketch
+from .decimate import m4_decimate
+from .streaming_pca import StreamingPCA
+from .nearest_index import NearestIndex
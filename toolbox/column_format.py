@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk formatting of table columns into text.
+
+@author: jlustigy
+"""
+
+import re
+
+import numpy as np
+
+__all__ = ["format_column", "align_decimal"]
+
+# Integer part of a number at the start of a string
+_INTEGER = re.compile(r'\s*[-+]?\d+')
+
+def _mod(fmt, values):
+    """Apply a %-format to every element of a flat array. Values are
+    formatted one by one on native Python scalars, which measured faster
+    than `numpy.char.mod`"""
+    if values.dtype.kind in 'biuf':
+        # Python scalars format much faster than numpy scalars
+        values = values.tolist()
+    return list(map(fmt.__mod__, values))
+
+def format_column(values, fmt="%.2f", errors=None, nantext=None,
+                  pm=r" $\pm$ ", errfmt=None, align=False,
+                  skip_nan_errors=True):
+    """
+    Format a whole column (or table) of values into text in one call.
+
+    Parameters
+    ----------
+    values : array
+        Values of any shape. May be a `numpy.ma.MaskedArray`. String columns
+        are kept as they are and ``fmt`` only applies to numbers
+    fmt : str
+        Format of the values (e.g. ``"%.2f"``)
+    errors : array (optional)
+        Symmetric uncertainties with the shape of values, printed as
+        ``value pm error``, or ``[plus, minus]`` for asymmetric uncertainties,
+        printed as ``value$^{+plus}_{-minus}$``. Non-finite uncertainties are
+        left out unless skip_nan_errors is False
+    nantext : str (optional)
+        Text of NaN, inf and masked values. If None, non-finite values are
+        formatted with fmt (e.g. ``nan``) and masked values are left empty
+    pm : str
+        Separator between values and symmetric uncertainties
+    errfmt : str (optional)
+        Format of the uncertainties, defaults to fmt
+    align : bool
+        Pad the text so the decimal points line up (see `align_decimal`)
+    skip_nan_errors : bool
+        Leave out non-finite uncertainties and the uncertainties of
+        non-finite values. If False, they are formatted with errfmt (e.g.
+        ``$^{+nan}_{-0.1}$``)
+
+    Returns
+    -------
+    texts : `numpy.array`
+        Object array of strings with the shape of values
+    """
+    mask = np.ma.getmaskarray(values)
+    data = np.asarray(np.ma.getdata(values))
+    shape = data.shape
+    flat = data.ravel()
+    mask = mask.ravel()
+
+    if flat.dtype.kind in 'biuf':
+        texts = _mod(fmt, flat)
+        bad = mask | ~np.isfinite(flat)
+    elif flat.dtype.kind == 'U':
+        texts = flat.tolist()
+        bad = mask
+    elif flat.dtype.kind == 'S':
+        texts = [value.decode() for value in flat.tolist()]
+        bad = mask
+    else:
+        texts = _mod(fmt, flat)
+        bad = mask
+    texts = np.array(texts, dtype=object)
+
+    if errors is not None:
+        if errfmt is None:
+            errfmt = fmt
+        if np.ndim(errors) == len(shape) + 1 and len(errors) == 2:
+            plus = np.asarray(errors[0], dtype=float).ravel()
+            minus = np.asarray(errors[1], dtype=float).ravel()
+            has = (~bad & np.isfinite(plus) & np.isfinite(minus)) if skip_nan_errors else ~mask
+            texts[has] = texts[has] + "$^{+" + np.array(_mod(errfmt, plus[has]), dtype=object) + \
+                         "}_{-" + np.array(_mod(errfmt, minus[has]), dtype=object) + "}$"
+        else:
+            err = np.asarray(errors, dtype=float).ravel()
+            has = (~bad & np.isfinite(err)) if skip_nan_errors else ~mask
+            texts[has] = texts[has] + pm + np.array(_mod(errfmt, err[has]), dtype=object)
+
+    # Placeholders
+    if nantext is not None:
+        texts[bad] = nantext
+    else:
+        texts[mask] = ""
+
+    if align:
+        texts = align_decimal(texts)
+
+    return texts.reshape(shape)
+
+def align_decimal(texts):
+    """
+    Pad text so the decimal points of all numbers line up, for plain-text
+    (monospace) tables.
+
+    Numbers without a decimal point are aligned at the end of their integer
+    part, and other text is right-aligned to the decimal point.
+
+    Parameters
+    ----------
+    texts : array
+        Strings of any shape
+
+    Returns
+    -------
+    aligned : `numpy.array`
+        Object array of strings of equal length with the shape of texts
+    """
+    texts = np.asarray(texts, dtype=object)
+    flat = [str(s) for s in texts.ravel().tolist()]
+    if len(flat) == 0:
+        return texts
+
+    points = []
+    for s in flat:
+        point = s.find('.')
+        if point < 0:
+            match = _INTEGER.match(s)
+            point = match.end() if match else len(s)
+        points.append(point)
+
+    left = max(points)
+    padded = [' ' * (left - point) + s for s, point in zip(flat, points)]
+    width = max(len(s) for s in padded)
+    aligned = np.array([s.ljust(width) for s in padded], dtype=object)
+    return aligned.reshape(texts.shape)
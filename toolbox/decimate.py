@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Level-of-detail decimation of dense curves for plotting.
+
+@author: jlustigy
+"""
+
+import numpy as np
+
+__all__ = ["m4_indices", "m4_decimate"]
+
+def m4_indices(x, y, nbins):
+    """Indices of the M4 decimation of a curve.
+
+    The x range is split into ``nbins`` equal columns (e.g. one per pixel) and
+    the first, last, minimum and maximum points of each column are kept, so
+    a line drawn through the decimated points looks the same as through all
+    of them at that resolution.
+
+    Parameters
+    ----------
+    x : array
+        Increasing x values
+    y : array
+        y values. NaNs are never chosen as min/max
+    nbins : int
+        Number of columns
+
+    Returns
+    -------
+    idx : np.ndarray
+        Sorted indices of the kept points (at most ``4 * nbins``)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n <= 4 * nbins:
+        return np.arange(n)
+
+    # Column of every point, contiguous because x is increasing
+    span = x[-1] - x[0]
+    if span > 0:
+        col = np.clip(((x - x[0]) / span * nbins).astype(np.intp), 0, nbins - 1)
+    else:
+        col = np.zeros(n, dtype=np.intp)
+    counts = np.bincount(col, minlength=nbins)
+    filled = counts > 0
+    first = (np.cumsum(counts) - counts)[filled]
+    last = np.cumsum(counts)[filled] - 1
+
+    # Position of the min/max within each column, NaNs are never picked
+    ylo = np.where(np.isnan(y), np.inf, y)
+    yhi = np.where(np.isnan(y), -np.inf, y)
+    cmin = np.minimum.reduceat(ylo, first)
+    cmax = np.maximum.reduceat(yhi, first)
+    colid = np.cumsum(filled) - 1
+    hits = np.flatnonzero(ylo == cmin[colid[col]])
+    imin = hits[np.unique(col[hits], return_index=True)[1]]
+    hits = np.flatnonzero(yhi == cmax[colid[col]])
+    imax = hits[np.unique(col[hits], return_index=True)[1]]
+
+    return np.unique(np.concatenate([first, last, imin, imax]))
+
+def m4_decimate(x, y, nbins):
+    """M4 decimation of a curve (see `m4_indices`).
+
+    Parameters
+    ----------
+    x : array
+        Increasing x values
+    y : array
+        y values
+    nbins : int
+        Number of columns, typically the width of the plot in pixels
+
+    Returns
+    -------
+    x, y : np.ndarray
+        Decimated curve
+    """
+    idx = m4_indices(x, y, nbins)
+    return np.asarray(x)[idx], np.asarray(y)[idx]
@@ -1,7 +1,212 @@
-def alphabet():
-    alphabetlist=['a','b','c','d','e','f','g','h','i','j','k','l','m','n','o','p','q','r','s','t','u','v','w','x','y','z']
-    for value in alphabetlist:
-        yield value
+import re
+import io
+from itertools import islice
+
+import numpy as np
+
+from .column_format import format_column
+
+__all__ = ["deluxetable", "write_deluxetable"]
+
+# Footnote marker in column names and data
+_NOTE_MARK = re.compile('#')
+
+_TABLE_HEAD = r"""
+\begin{%(table_call)s}{%(colsetting)s}
+\tablewidth{%(table_width)s}
+\tablecaption{\label{%(label)s} %(Caption)s }
+\tablehead{ %(colnames)s }
+\startdata
+"""
+
+_TABLE_FOOT = r"""
+\enddata
+%(notes)s%(comments)s\end{%(table_call)s}
+"""
+
+def _note_letter(i):
+    """Footnote letter of the i-th marker: a, b, ..., z, aa, ab, ..."""
+    letters = ''
+    i += 1
+    while i > 0:
+        i, r = divmod(i - 1, 26)
+        letters = chr(ord('a') + r) + letters
+    return letters
+
+class _Footnotes(object):
+    """Replaces ``#`` markers with lettered footnotes as text streams past"""
+
+    def __init__(self, comments):
+        self.comments = list(comments)
+        self.letters = []
+
+    def _mark(self, match):
+        letter = _note_letter(len(self.letters))
+        self.letters.append(letter)
+        return r'\tablenotemark{%s}' % letter
+
+    def sub(self, text):
+        return _NOTE_MARK.sub(self._mark, text)
+
+    def notetext(self):
+        return ''.join('\\tablenotetext{%s}{%s}\n' % (letter, comment)
+                       for letter, comment in zip(self.letters, self.comments))
+
+def _slice_errors(err, i, j):
+    """Rows i:j of symmetric or [plus, minus] uncertainties of a column"""
+    if err is None:
+        return None
+    if len(err) == 2 and np.ndim(err[0]) == 1:
+        return [err[0][i:j], err[1][i:j]]
+    return err[i:j]
+
+def _column_chunks(data, errors, chunksize):
+    """Yield chunks of column arrays (e.g. `numpy.memmap`) and their
+    uncertainties as lists of columns"""
+    nrows = len(data[0])
+    for col in data[1:]:
+        if len(col) != nrows:
+            raise ValueError('all columns must have the same length!')
+    for i in range(0, nrows, chunksize):
+        yield ([col[i:i+chunksize] for col in data],
+               [_slice_errors(err, i, i+chunksize) for err in errors])
+
+def _row_chunks(rows, ncols, chunksize):
+    """Yield chunks of an iterator of rows as lists of columns"""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunksize))
+        if not chunk:
+            return
+        for row in chunk:
+            if len(row) != ncols:
+                raise ValueError('number of column names does match number of values in a row!')
+        yield [list(col) for col in zip(*chunk)], [None] * ncols
+
+def write_deluxetable(f, colnames, data=None, rows=None, Caption='',
+                      colsetting='', comments=[], label='', fmt="%.2f",
+                      half_width=False, chunksize=10000, errors=None,
+                      nantext=None):
+    r"""
+    Write a LaTeX deluxetable to a file, formatting the data in chunks.
+
+    Every ``#`` in the column names and data is replaced by the next
+    footnote mark (a, b, c, ...) in a single pass, with the footnote texts
+    taken from comments in order.
+
+    Parameters
+    ----------
+    f : str or file
+        Output file name or file object opened for writing text
+    colnames : list
+        List of table column name strings
+    data : list (optional)
+        List of table columns (lists, arrays or `numpy.memmap`)
+    rows : iterable (optional)
+        Iterable of table rows, used instead of data
+    Caption : str
+        Table caption
+    colsetting : str
+        Column alignment (e.g. 'cccc')
+    comments : list or str
+        Footnote texts for the ``#`` markers, or the text of
+        ``\tablecomments``. A list is not written to ``\tablecomments``
+        (it used to be printed as e.g. ``\tablecomments{[]}``)
+    label : str
+        Table label (e.g. "tab:example")
+    fmt : str or list
+        Table column formatting
+    half_width: bool
+        Make a table spanning the half page width (for two column)
+    chunksize : int
+        Number of rows formatted at a time
+    errors : list (optional)
+        Uncertainties of each column of data (None for none), either an
+        array printed as ``value $\pm$ error`` or ``[plus, minus]`` arrays
+        printed as super/subscripts (see `format_column`)
+    nantext : str (optional)
+        Text of NaN, inf and masked values (e.g. ``r"\nodata"``). By default
+        NaN and inf are formatted with fmt
+    """
+
+    if len(colnames) == 0: raise ValueError('must have column names specified!')
+
+    if (data is None) == (rows is None):
+        raise ValueError('must provide either data or rows!')
+    elif data is not None and len(data) == 0:
+        raise ValueError('must have data provided!')
+
+    if data is not None and not len(colnames) == len(data):
+        raise ValueError('number of column names does match number of columns in the data!')
+    elif not colsetting == '' and not len(colsetting) == len(colnames):
+        raise ValueError('number of control characters in the colsetting does not match number of columns')
+    elif colsetting == '':
+        colsetting = 'c' * len(colnames)
+    else:pass
+
+    if isinstance(fmt, str):
+        fmts = [fmt for i in range(len(colnames))]
+    else:
+        fmts = fmt
+
+    if half_width:
+        # Using multicol, half page width
+        table_call = "deluxetable"
+        table_width = r"0.47\linewidth"
+    else:
+        # Using full page width
+        table_call = "deluxetable*"
+        table_width = r"\linewidth"
+
+    if isinstance(comments, str):
+        notes = _Footnotes([])
+        tablecomments = '\\tablecomments{%s}\n' % comments if comments else ''
+    else:
+        notes = _Footnotes(comments)
+        tablecomments = ''
+
+    if errors is None:
+        errors = [None] * len(colnames)
+    elif data is None or not len(errors) == len(colnames):
+        raise ValueError('errors must be given for every column of data!')
+
+    if isinstance(f, str):
+        with open(f, 'w') as fobj:
+            return write_deluxetable(fobj, colnames, data=data, rows=rows,
+                                     Caption=Caption, colsetting=colsetting,
+                                     comments=comments, label=label, fmt=fmts,
+                                     half_width=half_width, chunksize=chunksize,
+                                     errors=errors, nantext=nantext)
+
+    cols = notes.sub(''.join(r'\colhead{%s}  &' % name for name in colnames)[:-1])
+    f.write(_TABLE_HEAD % {'label':label,
+                           'colsetting':colsetting,
+                           'Caption':Caption,
+                           'colnames':cols,
+                           'table_call':table_call,
+                           'table_width':table_width})
+
+    if data is not None:
+        chunks = _column_chunks(data, errors, chunksize)
+    else:
+        chunks = _row_chunks(rows, len(colnames), chunksize)
+
+    # Values are still formatted one by one with Python's % (on native
+    # scalars, which beats numpy.char.mod), but a column chunk at a time
+    first = True
+    for chunk, errs in chunks:
+        columns = [format_column(col, fmts[icol], errors=errs[icol],
+                                 nantext=nantext).tolist()
+                   for icol, col in enumerate(chunk)]
+        text = '\\\\\n'.join(['&  '.join(cells) for cells in zip(*columns)])
+        if not first:
+            f.write('\\\\\n')
+        f.write(notes.sub(text))
+        first = False
+
+    f.write(_TABLE_FOOT % {'notes':notes.notetext(),
+                           'comments':tablecomments,
+                           'table_call':table_call})
 
 class deluxetable:
     """
@@ -11,17 +216,12 @@ class deluxetable:
     (https://sites.google.com/site/zhuweiweipku/my-python-projects-2/tex-table-class)
     """
 
-    def alphabet(self):
-        alphabetlist=['a','b','c','d','e','f','g','h','i','j','k','l','m','n','o','p','q','r','s','t','u','v','w','x','y','z']
-        for value in alphabetlist:
-            self.commentslines += '\\tablenotetext{%s}{%s}\n' % (value, self.comments.next())
-            #print '\tablenotetext{%s}{%s}' % (value, self.comments.next())
-            yield value
-
     def __init__(self, Caption='', colsetting='', colnames=[], data=[],
-                 comments=[],label='', fmt="%.2f", half_width=False):
-        """
-        Create a LaTeX deluxetable.
+                 comments=[],label='', fmt="%.2f", half_width=False,
+                 errors=None, nantext=None):
+        r"""
+        Create a LaTeX deluxetable. Use `write_deluxetable` to stream very
+        large tables straight to a file.
 
         Parameters
         ----------
@@ -33,81 +233,29 @@ class deluxetable:
             List of table column name strings
         data : list
             List of table column data
-        comments : list
-            Table comments
+        comments : list or str
+            Footnote texts for the ``#`` markers, or the text of
+            ``\tablecomments``
         label : str
             Table label (e.g. "tab:example")
         fmt : str or list
             Table column formatting
         half_width: bool
             Make a table spanning the half page width (for two column)
+        errors : list (optional)
+            Uncertainties of each column (None for none), see
+            `write_deluxetable`
+        nantext : str (optional)
+            Text of NaN, inf and masked values (e.g. ``r"\nodata"``)
         """
 
-        if colnames == []: raise InputError('must have column names specified!')
-
-        if data == []: raise InputError('must have data provided!')
-
-        if not len(colnames) == len(data):
-            raise InputError('number of column names does match number of columns in the data!')
-        elif not colsetting == '' and not len(colsetting) == len(colnames):
-            raise InputError('number of control characters in the colsetting does not match number of columns')
-        elif colsetting == '':
-            colsetting = 'c' * len(colnames)
-        else:pass
-
-        if type(fmt) == str:
-            fmts = [fmt for i in range(len(colnames))]
-        else:
-            fmts = fmt
-
-        if half_width:
-            # Using multicol, half page width
-            table_call = "deluxetable"
-            table_width = "0.47\linewidth"
-        else:
-            # Using full page width
-            table_call = "deluxetable*"
-            table_width = "\linewidth"
-
         self.comments = comments
-        self.commentslines = ''
-        cols=''
-        abc = self.alphabet()
-        for name in colnames:
-            while not name.find('#') == -1:name = name.replace('#',r'\tablenotemark{%s}' % abc.next(), 1)
-            cols += '\colhead{%s}  &' % name
-        cols = cols[:-1]
-        rowcounts = len(data[0])
-        colcounts = len(data)
-        datalines = []
-        for irow in range(rowcounts):
-            datarow = fmts[0] %(data[0][irow])
-            for icol in range(1,colcounts):
-                datarow += '&  ' + fmts[icol] %(data[icol][irow])
-            datalines.append(datarow)
-        datatable = '\\\\\n'.join(datalines)
-        while not datatable.find('#') == -1:datatable = datatable.replace('#',r'\tablenotemark{%s}' % abc.next(), 1)
-
-
-
-        self.parsestring = r"""
-\begin{%(table_call)s}{%(colsetting)s}
-\tablewidth{%(table_width)s}
-\tablecaption{\label{%(label)s} %(Caption)s }
-\tablehead{ %(colnames)s }
-\startdata
-%(data)s
-\enddata
-\tablecomments{%(comments)s}
-\end{%(table_call)s}
-""" % {'label':label,
-       'colsetting':colsetting,
-       'Caption':Caption,
-       'colnames':cols,
-       'data':datatable,
-       'comments':self.comments,
-       'table_call':table_call,
-       'table_width':table_width}
+        buf = io.StringIO()
+        write_deluxetable(buf, colnames, data=data, Caption=Caption,
+                          colsetting=colsetting, comments=comments, label=label,
+                          fmt=fmt, half_width=half_width, errors=errors,
+                          nantext=nantext)
+        self.parsestring = buf.getvalue()
 
 
     def __str__(self):
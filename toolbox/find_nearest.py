@@ -7,8 +7,61 @@ Created on Thu Mar  3 22:54:08 2016
 
 import numpy as np
 
-def find_nearest(array,value):
+def _nearest_sorted(array, values, order=None):
+    """Indices of the nearest elements of an ascending array to each value,
+    by binary search. Ties go to the lower index, like argmin. If array was
+    sorted with ``order = np.argsort(a, kind='stable')``, pass order to get
+    (and tie-break on) indices into the unsorted ``a``.
+    """
+    n = len(array)
+    idx = np.searchsorted(array, values, side='left')
+    lo = np.clip(idx - 1, 0, n - 1)
+    hi = np.clip(idx, 0, n - 1)
+    # First occurrence of the lower neighbour's value
+    lo = np.searchsorted(array, array[lo], side='left')
+    dlo = np.abs(array[lo] - values)
+    dhi = np.abs(array[hi] - values)
+    if order is not None:
+        lo = order[lo]
+        hi = order[hi]
+    pick_lo = (dlo < dhi) | ((dlo == dhi) & (lo <= hi))
+    return np.where(pick_lo, lo, hi)
+
+def find_nearest(array, value, assume_sorted=None):
     """Finds index of array nearest to the value
+
+    Parameters
+    ----------
+    array : array
+        1D array to search
+    value : float or array
+        Value(s) to look up
+    assume_sorted : bool (optional)
+        Whether array is sorted in ascending order. Checked if None. Sorted
+        arrays are searched with `numpy.searchsorted`, unsorted arrays are
+        argsorted first when there are many values to look up
+
+    Returns
+    -------
+    idx : int or np.ndarray
+        Index of the nearest element for each value (same shape as value)
     """
-    idx = (np.abs(array-value)).argmin()
-    return idx
\ No newline at end of file
+    array = np.asarray(array)
+    values = np.asarray(value)
+
+    if assume_sorted is None:
+        assume_sorted = bool(np.all(array[1:] >= array[:-1]))
+
+    if assume_sorted:
+        idx = _nearest_sorted(array, values)
+    elif values.size <= 8:
+        # A few direct scans are cheaper than sorting
+        idx = np.array([(np.abs(array - v)).argmin() for v in values.ravel()],
+                       dtype=np.intp).reshape(values.shape)
+    else:
+        order = np.argsort(array, kind='stable')
+        idx = _nearest_sorted(array[order], values, order=order)
+
+    if np.ndim(value) == 0:
+        return int(idx)
+    return idx
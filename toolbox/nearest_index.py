@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Reusable index for repeated nearest-neighbour lookups in an array.
+
+@author: jlustigy
+"""
+
+import numpy as np
+
+from .find_nearest import _nearest_sorted
+
+__all__ = ["NearestIndex"]
+
+class NearestIndex(object):
+    """
+    Nearest-neighbour index built once from an array and queried many times.
+
+    1D arrays are argsorted once and searched with `numpy.searchsorted`;
+    arrays of points with shape ``(N, d)`` are put in a
+    `scipy.spatial.cKDTree`. Points with non-finite coordinates are left out
+    of the index. All queries are vectorized over the query points and
+    return indices into the original array.
+
+    Parameters
+    ----------
+    points : array
+        1D array of values, or ``(N, d)`` array of points
+    leafsize : int (optional)
+        Leaf size of the KD-tree (N-D points only)
+
+    Example
+    -------
+    >>> index = NearestIndex(wl)
+    >>> i = index.nearest([500., 550., 600.])
+    >>> lo, hi = index.bracket(555.)
+    """
+
+    def __init__(self, points, leafsize=16):
+        points = np.asarray(points, dtype=float)
+        if points.ndim not in (1, 2):
+            raise ValueError("points must be a 1D array or have shape (N, d)")
+        self.points = points
+        self.ndim = points.ndim
+
+        if self.ndim == 1:
+            valid = np.flatnonzero(np.isfinite(points))
+            self._order = valid[np.argsort(points[valid], kind='stable')]
+            self._sorted = points[self._order]
+            self.n = len(self._order)
+        else:
+            from scipy.spatial import cKDTree
+            self._valid = np.flatnonzero(np.all(np.isfinite(points), axis=1))
+            self._tree = cKDTree(points[self._valid], leafsize=leafsize)
+            self.n = len(self._valid)
+
+        if self.n == 0:
+            raise ValueError("NearestIndex needs at least one finite point")
+
+    def _queries(self, x):
+        """Query values as an array, checking the dimension of N-D points"""
+        x = np.asarray(x, dtype=float)
+        if self.ndim == 2 and (x.ndim == 0 or x.shape[-1] != self.points.shape[1]):
+            raise ValueError("query points must have shape (..., %i)" %self.points.shape[1])
+        return x
+
+    def nearest(self, x, return_distance=False):
+        """
+        Index of the nearest point to each query. Ties go to the lowest
+        index, as in `find_nearest`.
+
+        Parameters
+        ----------
+        x : float or array
+            Query values (1D index) or points of shape ``(..., d)``
+        return_distance : bool (optional)
+            Also return the distance to the nearest point
+
+        Returns
+        -------
+        idx : int or np.ndarray
+            Index of the nearest point, -1 for non-finite queries
+        dist : float or np.ndarray
+            Distance to the nearest point, inf for non-finite queries. Only
+            if return_distance is True
+        """
+        x = self._queries(x)
+        if self.ndim == 1:
+            fin = np.isfinite(x)
+            idx = _nearest_sorted(self._sorted, np.where(fin, x, self._sorted[0]),
+                                  order=self._order)
+            idx = np.where(fin, idx, -1)
+            dist = np.where(fin, np.abs(self.points[idx] - x), np.inf)
+        else:
+            fin = np.all(np.isfinite(x), axis=-1)
+            dist, i = self._tree.query(np.where(fin[..., None], x, 0.0))
+            idx = np.where(fin, self._valid[np.minimum(i, self.n - 1)], -1)
+            dist = np.where(fin, dist, np.inf)
+
+        if np.ndim(idx) == 0:
+            idx, dist = int(idx), float(dist)
+        if return_distance:
+            return idx, dist
+        return idx
+
+    def k_nearest(self, x, k, return_distance=False):
+        """
+        Indices of the k nearest points to each query, nearest first.
+
+        Parameters
+        ----------
+        x : float or array
+            Query values (1D index) or points of shape ``(..., d)``
+        k : int
+            Number of neighbours, at most the number of indexed points
+        return_distance : bool (optional)
+            Also return the distances
+
+        Returns
+        -------
+        idx : np.ndarray
+            Indices with shape ``query shape + (k,)``, -1 for non-finite
+            queries
+        dist : np.ndarray
+            Distances with the same shape, inf for non-finite queries. Only
+            if return_distance is True
+        """
+        k = int(k)
+        if not 1 <= k <= self.n:
+            raise ValueError("k must be between 1 and the number of points (%i)" %self.n)
+        x = self._queries(x)
+
+        if self.ndim == 1:
+            fin = np.isfinite(x)
+            xf = np.where(fin, x, self._sorted[0])
+            # The k nearest values are a contiguous run of the sorted array
+            # inside the 2k values around the insertion point
+            w = min(2 * k, self.n)
+            pos = np.searchsorted(self._sorted, xf)
+            start = np.clip(pos - k, 0, self.n - w)
+            cand = start[..., None] + np.arange(w)
+            cdist = np.abs(self._sorted[cand] - xf[..., None])
+            best = np.argsort(cdist, axis=-1, kind='stable')[..., :k]
+            idx = self._order[np.take_along_axis(cand, best, axis=-1)]
+            dist = np.take_along_axis(cdist, best, axis=-1)
+        else:
+            fin = np.all(np.isfinite(x), axis=-1)
+            dist, i = self._tree.query(np.where(fin[..., None], x, 0.0), k=[k] if k == 1 else k)
+            idx = self._valid[np.minimum(i, self.n - 1)]
+
+        idx = np.where(fin[..., None], idx, -1)
+        dist = np.where(fin[..., None], dist, np.inf)
+        if return_distance:
+            return idx, dist
+        return idx
+
+    def within(self, x, radius):
+        """
+        Indices of all points within a distance of each query.
+
+        Parameters
+        ----------
+        x : float or array
+            Query values (1D index) or points of shape ``(..., d)``
+        radius : float
+            Search radius (inclusive)
+
+        Returns
+        -------
+        idx : np.ndarray or list
+            Sorted indices for a single query, otherwise a list with one
+            array of indices per query (in flattened query order)
+        """
+        x = self._queries(x)
+        single = x.ndim == (0 if self.ndim == 1 else 1)
+
+        if self.ndim == 1:
+            xs = np.reshape(x, -1)
+            lo = np.searchsorted(self._sorted, xs - radius, side='left')
+            hi = np.searchsorted(self._sorted, xs + radius, side='right')
+            hits = [np.sort(self._order[l:h]) for l, h in zip(lo, hi)]
+        else:
+            xs = x.reshape(-1, self.points.shape[1])
+            fin = np.all(np.isfinite(xs), axis=1)
+            hits = [np.sort(self._valid[i]) if f else np.array([], dtype=np.intp)
+                    for i, f in zip(self._tree.query_ball_point(np.where(fin[:, None], xs, 0.0), radius), fin)]
+        hits = [np.asarray(h, dtype=np.intp) for h in hits]
+
+        if single:
+            return hits[0]
+        return hits
+
+    def bracket(self, x):
+        """
+        Indices of the points on either side of each query (1D index only).
+
+        Parameters
+        ----------
+        x : float or array
+            Query values
+
+        Returns
+        -------
+        lo : int or np.ndarray
+            Index of the largest value <= x, -1 if there is none
+        hi : int or np.ndarray
+            Index of the smallest value >= x, -1 if there is none
+        """
+        if self.ndim != 1:
+            raise ValueError("bracket is only defined for a 1D index")
+        x = self._queries(x)
+        fin = np.isfinite(x)
+        # First occurrence of a repeated value on both sides
+        ilo = np.searchsorted(self._sorted, x, side='right') - 1
+        ilo = np.where(ilo >= 0, np.searchsorted(self._sorted, self._sorted[np.maximum(ilo, 0)], side='left'), -1)
+        ihi = np.searchsorted(self._sorted, x, side='left')
+        lo = np.where(fin & (ilo >= 0), self._order[np.maximum(ilo, 0)], -1)
+        hi = np.where(fin & (ihi < self.n), self._order[np.minimum(ihi, self.n - 1)], -1)
+
+        if np.ndim(lo) == 0:
+            return int(lo), int(hi)
+        return lo, hi
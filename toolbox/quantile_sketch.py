@@ -0,0 +1,204 @@
+import numpy as np
+
+__all__ = ["HistogramSketch"]
+
+def _nonsingular(lo, hi):
+    """Widen a zero-width range"""
+    if hi > lo:
+        return lo, hi
+    pad = 0.5 * abs(lo) if lo != 0 else 0.5
+    return lo - pad, lo + pad
+
+class HistogramSketch(object):
+    """
+    Mergeable, fixed-memory approximate quantile sketch for one or more groups.
+
+    Values are accumulated into a regular histogram per group. When new
+    values fall outside of the current range, the range is doubled and
+    neighbouring bins are collapsed in pairs, so any stream of values can be
+    accumulated in a single pass. All groups share the same range.
+
+    Quantiles interpolate between order statistics like `numpy.quantile`,
+    with every order statistic placed within the bin that holds it, so the
+    error is at most one bin width, ``(hi - lo) / bins`` of the final shared
+    range. Groups whose values span only a small part of that range are
+    therefore resolved coarsely. Merging a sketch with a different range
+    adds up to one of its bin widths.
+
+    Parameters
+    ----------
+    ngroups : int
+        Number of independent groups (e.g. hexagonal cells)
+    bins : int
+        Number of histogram bins per group (must be even)
+    range : tuple (optional)
+        Initial ``(min, max)`` of the histogram. Defaults to the range of the
+        first values seen
+
+    Example
+    -------
+    >>> sk = HistogramSketch()
+    >>> for chunk in chunks:
+    ...     sk.update(chunk)
+    >>> sk.quantile([0.01, 0.99])
+    """
+
+    def __init__(self, ngroups=1, bins=256, range=None):
+
+        if bins % 2 != 0:
+            bins += 1
+
+        self.ngroups = ngroups
+        self.bins = bins
+        self.counts = np.zeros((ngroups, bins))
+        if range is None:
+            self.lo, self.hi = None, None
+        else:
+            self.lo, self.hi = _nonsingular(float(range[0]), float(range[1]))
+
+    @property
+    def edges(self):
+        """Histogram bin edges"""
+        return np.linspace(self.lo, self.hi, self.bins + 1)
+
+    @property
+    def total(self):
+        """Number of values accumulated in each group"""
+        return self.counts.sum(axis=1)
+
+    def _grow(self, vmin, vmax):
+        """Double the range until it covers [vmin, vmax]"""
+        if not self.hi > self.lo:
+            # A zero-width range would never grow
+            self.lo, self.hi = _nonsingular(self.lo, self.hi)
+        while (vmin < self.lo) or (vmax > self.hi):
+            width = self.hi - self.lo
+            # Collapse neighbouring bins in pairs
+            half = self.counts.reshape(self.ngroups, self.bins // 2, 2).sum(axis=2)
+            self.counts = np.zeros_like(self.counts)
+            if vmin < self.lo:
+                # Extend downward, old range becomes the upper half
+                self.counts[:, self.bins // 2:] = half
+                self.lo = self.hi - 2.0 * width
+            else:
+                # Extend upward, old range becomes the lower half
+                self.counts[:, :self.bins // 2] = half
+                self.hi = self.lo + 2.0 * width
+
+    def update(self, values, group=None, weights=None):
+        """
+        Accumulate a chunk of values.
+
+        Parameters
+        ----------
+        values : array
+            Values to add. Non-finite values are ignored
+        group : array (optional)
+            Group index of each value (defaults to group 0). Negative indices
+            are ignored
+        weights : array (optional)
+            Weight of each value
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        if group is None:
+            group = np.zeros(len(values), dtype=int)
+        else:
+            group = np.asarray(group).ravel()
+
+        good = np.isfinite(values) & (group >= 0)
+        if weights is not None:
+            weights = np.asarray(weights, dtype=float).ravel()[good]
+        values = values[good]
+        group = group[good]
+        if len(values) == 0:
+            return
+
+        vmin, vmax = values.min(), values.max()
+
+        # Set the range from the first chunk seen
+        if self.lo is None:
+            self.lo, self.hi = _nonsingular(vmin, vmax)
+        else:
+            self._grow(vmin, vmax)
+
+        # Bin index of every value
+        idx = ((values - self.lo) / (self.hi - self.lo) * self.bins).astype(int)
+        idx = np.clip(idx, 0, self.bins - 1)
+
+        flat = np.bincount(group * self.bins + idx, weights=weights,
+                           minlength=self.ngroups * self.bins)
+        self.counts += flat.reshape(self.ngroups, self.bins)
+
+    def merge(self, other):
+        """
+        Fold another sketch with the same number of groups into this one.
+
+        Parameters
+        ----------
+        other : HistogramSketch
+            Sketch to merge
+        """
+        if other.lo is None:
+            return
+        if self.lo is None:
+            self.lo, self.hi = other.lo, other.hi
+            self.bins = other.bins
+            self.counts = other.counts.copy()
+            return
+
+        self._grow(other.lo, other.hi)
+
+        # Re-bin the other sketch's bin centers onto this range
+        centers = 0.5 * (other.edges[1:] + other.edges[:-1])
+        group = np.repeat(np.arange(other.ngroups), other.bins)
+        self.update(np.tile(centers, other.ngroups), group=group,
+                    weights=other.counts.ravel())
+
+    def quantile(self, q):
+        """
+        Approximate quantiles of every group.
+
+        Parameters
+        ----------
+        q : float or array
+            Quantile(s) in [0, 1]
+
+        Returns
+        -------
+        quantiles : np.ndarray
+            Array of shape ``(ngroups,)`` for scalar q, or ``(ngroups, len(q))``.
+            NaN for empty groups
+        """
+        qarr = np.atleast_1d(np.asarray(q, dtype=float))
+        out = np.full((self.ngroups, len(qarr)), np.nan)
+        if self.lo is None:
+            return out[:, 0] if np.ndim(q) == 0 else out
+
+        cdf = np.cumsum(self.counts, axis=1)
+        total = cdf[:, -1]
+        width = (self.hi - self.lo) / self.bins
+        filled = total > 0
+        rows = np.arange(self.ngroups)
+
+        def order_statistic(k):
+            # Place the k-th smallest value (0-based) at its share of the
+            # bin holding it
+            ibin = np.minimum((cdf <= k[:, None]).sum(axis=1), self.bins - 1)
+            below = np.where(ibin > 0, cdf[rows, np.maximum(ibin - 1, 0)], 0.0)
+            inbin = np.where(self.counts[rows, ibin] > 0, self.counts[rows, ibin], 1.0)
+            frac = np.clip((k + 0.5 - below) / inbin, 0.0, 1.0)
+            return self.lo + (ibin + frac) * width
+
+        for k, qk in enumerate(qarr):
+            # Interpolate between the bracketing order statistics, as in
+            # numpy.quantile
+            pos = qk * np.maximum(total - 1, 0)
+            klo = np.floor(pos)
+            khi = np.minimum(klo + 1, np.maximum(total - 1, 0))
+            vlo = order_statistic(klo)
+            vhi = order_statistic(khi)
+            out[filled, k] = (vlo + (pos - klo) * (vhi - vlo))[filled]
+
+        if np.ndim(q) == 0:
+            return out[:, 0]
+        return out
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Principal component analysis of data streamed in chunks.
+
+@author: jlustigy
+"""
+
+import numpy as np
+
+__all__ = ["StreamingPCA", "iter_rows"]
+
+def iter_rows(data, chunksize=100000):
+    """
+    Iterate over an array (or `numpy.memmap`) in chunks of rows.
+
+    Parameters
+    ----------
+    data : array
+        Array of shape (M, d)
+    chunksize : int
+        Number of rows per chunk
+
+    Returns
+    -------
+    chunks : generator
+        Arrays of shape (<=chunksize, d)
+    """
+    for i in range(0, len(data), chunksize):
+        yield np.asarray(data[i:i+chunksize], dtype=float)
+
+class StreamingPCA(object):
+    """
+    Exact PCA fitted in one pass over chunks of samples, in O(d^2) memory.
+
+    The mean and scatter matrix are accumulated per chunk and combined with
+    the parallel algorithm of Chan et al. (1979); the components are the
+    eigenvectors of the resulting covariance matrix. Rows with non-finite
+    values are skipped.
+
+    Parameters
+    ----------
+    n_components : int (optional)
+        Number of components to keep, defaults to all
+
+    Example
+    -------
+    >>> pca = StreamingPCA(5)
+    >>> for chunk in iter_rows(features):
+    ...     pca.partial_fit(chunk)
+    >>> lowdim = pca.transform(features[:1000])
+    """
+
+    def __init__(self, n_components=None):
+        self.n_components = n_components
+        self.n = 0
+        self.mean = None
+        self.m2 = None
+        self.components_ = None
+
+    def partial_fit(self, chunk):
+        """
+        Accumulate a chunk of samples.
+
+        Parameters
+        ----------
+        chunk : array
+            Array of shape (m, d)
+        """
+        X = np.asarray(chunk, dtype=float)
+        X = X[np.all(np.isfinite(X), axis=1)]
+        nb = len(X)
+        if nb == 0:
+            return self
+        mean_b = X.mean(axis=0)
+        Xc = X - mean_b
+        m2_b = np.dot(Xc.T, Xc)
+
+        if self.n == 0:
+            self.n, self.mean, self.m2 = nb, mean_b, m2_b
+        else:
+            ntot = self.n + nb
+            delta = mean_b - self.mean
+            self.m2 = self.m2 + m2_b + np.outer(delta, delta) * (self.n * nb / float(ntot))
+            self.mean = self.mean + delta * (nb / float(ntot))
+            self.n = ntot
+
+        # Components are recomputed on demand
+        self.components_ = None
+        return self
+
+    def fit(self, chunks):
+        """
+        Fit from an iterable of chunks (see `iter_rows`).
+
+        Parameters
+        ----------
+        chunks : iterable
+            Arrays of shape (m, d)
+        """
+        for chunk in chunks:
+            self.partial_fit(chunk)
+        self._solve()
+        return self
+
+    def _solve(self):
+        if self.n < 2:
+            raise ValueError("StreamingPCA needs at least 2 samples")
+        cov = self.m2 / (self.n - 1)
+        evals, evecs = np.linalg.eigh(cov)
+        order = np.argsort(evals)[::-1][:self.n_components]
+        evecs = evecs[:, order].T
+        # Deterministic signs: largest loading of each component positive
+        signs = np.sign(evecs[np.arange(len(evecs)), np.argmax(np.abs(evecs), axis=1)])
+        self.components_ = evecs * signs[:, None]
+        self.explained_variance_ = evals[order]
+        self.explained_variance_ratio_ = evals[order] / np.sum(evals)
+
+    def transform(self, X):
+        """
+        Project samples onto the components.
+
+        Parameters
+        ----------
+        X : array
+            Array of shape (m, d)
+
+        Returns
+        -------
+        lowdim : np.ndarray
+            Array of shape (m, n_components)
+        """
+        if self.components_ is None:
+            self._solve()
+        return np.dot(np.asarray(X, dtype=float) - self.mean, self.components_.T)